@@ -0,0 +1,37 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserBase
+from .tokens import is_token_revoked
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+        JWT_STATELESS_AUTH = True
+        request.user is TokenUser made from token claims (id, is_active,
+        is_staff, is_superuser), no UserBase query per request. Deactivated
+        or changed users are rejected by revocation cache (tokens.py).
+        Tokens without claims (issued before) -> user from db as before.
+    """
+    def get_user(self, validated_token):
+        if "is_active" not in validated_token:
+            return super().get_user(validated_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise AuthenticationFailed(_("Token contained no recognizable user identification"), code="user_not_found")
+        if not validated_token["is_active"] or is_token_revoked(validated_token):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+
+
+def get_user_instance(user):
+    """
+        request.user as UserBase row, TokenUser (stateless auth) has only
+        claims, so views which change user load it here.
+    """
+    if isinstance(user, TokenUser):
+        return UserBase.objects.get(pk = user.pk)
+    return user
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens from token_blacklist tables in small batches (run by cron, e.g. daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.TOKEN_BLACKLIST_PRUNE_BATCH_SIZE, help="Tokens deleted in one transaction")
+
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # SHORT TRANSACTIONS, REFRESH REQUESTS ARE NOT BLOCKED FOR LONG
+            with transaction.atomic():
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte = now)
+                    .order_by("id").values_list("id", flat = True)[:batch_size]
+                )
+                if not ids:
+                    break
+                # BLACKLISTED ROWS ARE DELETED BY CASCADE, ONE QUERY PER TABLE
+                OutstandingToken.objects.filter(id__in = ids).delete()
+            deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"{deleted} expired tokens deleted."))
@@ -0,0 +1,14 @@
+from backend.account.models import UserBase
+from backend.restaurant.models import Feedback
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+
+class Command(BaseCommand):
+    help = "Set UserBase.has_feedback from feedbacks (after import or for users from before the flag)"
+
+    def handle(self, *args, **options):
+        feedback_exists = Exists(Feedback.objects.filter(customer_id = OuterRef("pk")))
+        added = UserBase.objects.filter(feedback_exists, has_feedback = False).update(has_feedback = True)
+        removed = UserBase.objects.filter(~feedback_exists, has_feedback = True).update(has_feedback = False)
+        self.stdout.write(self.style.SUCCESS(f"has_feedback set for {added} users, unset for {removed} users."))
@@ -2,13 +2,15 @@ from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django_resized import ResizedImageField
 
 from .utils import generate_unique_filename
 from .validators import validate_uzb_phone_number
 
 # Create your models here.
 
+# USER FIELDS COPIED TO TOKEN, STATELESS AUTH READS THEM WITHOUT QUERY
+USER_CLAIM_FIELDS = ("is_active", "is_staff", "is_superuser")
+
 class CustomUserBaseManager(BaseUserManager):
     def create_superuser(self, phone_number, password, **other_fields):
 
@@ -58,12 +60,15 @@ class UserBase(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(_("phone_number"), max_length=13, unique=True, validators=[validate_uzb_phone_number])
     phone_token = models.CharField(max_length=6, null=True, blank=True)
     status = models.CharField(_("status"), max_length=15, choices=STATUS_OF_USER, default='CUSTOMER')
-    avatar = ResizedImageField(
+    avatar = models.ImageField(
         _("avatar"),
         upload_to = generate_unique_filename,
         default = 'avatars/no_photo.png'
     )
 
+    # KEPT BY FEEDBACK SIGNALS, TOKEN CLAIM "is_feedback" WITHOUT QUERY
+    has_feedback = models.BooleanField(_("has feedback"), default=False)
+
     #User status
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -96,6 +101,16 @@ class UserBase(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = 'Accounts'
     
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # REMEMBER LOADED TOKEN CLAIMS, IF THEY ARE CHANGED TOKENS ARE REVOKED (signals.py)
+        instance._loaded_claims = {
+            field: instance.__dict__[field] for field in USER_CLAIM_FIELDS if field in instance.__dict__
+        }
+        return instance
+
+
     def __str__(self):
         return f"{self.phone_number} & id is {self.pk}"
         
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import USER_CLAIM_FIELDS, UserBase
+from .tokens import revoke_user_tokens
+
+
+@receiver(post_save, sender=UserBase)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """
+        Deactivated user or changed is_staff/is_superuser -> claims of his
+        tokens are old, stateless auth does not accept them.
+    """
+    if raw or created:
+        return
+    loaded = getattr(instance, "_loaded_claims", {})
+    if any(instance.__dict__.get(field) != value for field, value in loaded.items()):
+        revoke_user_tokens(instance.pk)
+    instance._loaded_claims = {
+        field: instance.__dict__[field] for field in USER_CLAIM_FIELDS if field in instance.__dict__
+    }
@@ -1,3 +1,229 @@
-from django.test import TestCase
+import io
+from collections import OrderedDict
+from datetime import timedelta
+from unittest import mock
+
+from backend.account import tokens
+from backend.account.authentication import StatelessJWTAuthentication
+from backend.account.models import UserBase
+from backend.account.tokens import UserRefreshToken
+from backend.api.v1.account.views import MyTokenObtainPairSerializer
+from backend.api.v1.viewsets.throttles import TokenBucketThrottle
+from backend.restaurant.models import Feedback, Restaurant
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
 
 # Create your tests here.
+
+
+class TokenFeedbackClaimTestCase(TestCase):
+    """
+        "is_feedback" claim comes from UserBase.has_feedback, no query on login
+    """
+    def setUp(self):
+        self.user = UserBase.objects.create_user("+998901234567", "pass1234", is_active = True)
+        self.restaurant = Restaurant.objects.bulk_create([
+            Restaurant(name="Foodify", slug="foodify", about_us="about", phone_number1="+998901234567", domain_name="foodify.uz")
+        ])[0]
+
+
+    def get_token(self):
+        user = UserBase.objects.get(pk = self.user.pk)
+        # ONLY INSERT OF OUTSTANDING TOKEN (token_blacklist), NO FEEDBACK QUERY
+        with self.assertNumQueries(1):
+            return MyTokenObtainPairSerializer.get_token(user)
+
+
+    def test_token_without_feedback(self):
+        self.assertFalse(self.get_token()["is_feedback"])
+
+
+    def test_token_after_feedback_is_posted_and_removed(self):
+        feedback = Feedback.objects.create(restaurant = self.restaurant, customer = self.user, rating = 5, feedback = "good")
+        self.assertTrue(self.get_token()["is_feedback"])
+
+        feedback.delete()
+        self.assertFalse(self.get_token()["is_feedback"])
+
+
+
+# FAST HASHER, EVERY LOGIN CHECKS A PASSWORD
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoginThrottleTestCase(TestCase):
+    """
+        Token bucket of login per IP: burst of N, 429 with Retry-After,
+        one token back every period/N, X-Forwarded-For is not trusted
+    """
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.now = 1000.0
+        for patcher in (
+            mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, {"login": "3/min"}),
+            mock.patch.object(TokenBucketThrottle, "timer", lambda throttle: self.now),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+    def login(self, **headers):
+        return self.client.post("/api/v1/auth/token/", {"phone_number": "+998901111111", "password": "wrong"}, **headers)
+
+
+    def test_burst_then_429(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "20")
+
+
+    def test_refill(self):
+        for _ in range(3):
+            self.login()
+        self.now += 10
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "10")
+
+        # ONE TOKEN AFTER 20 SECONDS, NOT THE WHOLE BUCKET
+        self.now += 10
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 429)
+
+        # FULL BUCKET AFTER THE WHOLE PERIOD
+        self.now += 60
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 429)
+
+
+    def test_forwarded_for_is_not_trusted(self):
+        for number in range(3):
+            self.login(HTTP_X_FORWARDED_FOR = f"10.0.0.{number}")
+        self.assertEqual(self.login(HTTP_X_FORWARDED_FOR = "10.0.0.99").status_code, 429)
+        # OTHER CLIENT (REMOTE_ADDR) HAS ITS OWN BUCKET
+        self.assertEqual(self.login(REMOTE_ADDR = "192.168.1.5").status_code, 401)
+
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class StatelessAuthTestCase(TestCase):
+    """
+        TokenUser from claims without query, inactive or changed user is
+        rejected until refresh reads him from db again
+    """
+    def setUp(self):
+        cache.clear()
+        UserBase.objects.create_user("+998901234567", "pass1234", is_active = True)
+        self.user = UserBase.objects.get()
+        self.refresh = UserRefreshToken.for_user(self.user)
+
+
+    def authenticate(self, access):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION = f"Bearer {access}")
+        return StatelessJWTAuthentication().authenticate(request)[0]
+
+
+    def refresh_token(self):
+        return self.client.post("/api/v1/auth/token/refresh/", {"refresh": str(self.refresh)})
+
+
+    def test_token_user(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.refresh.access_token)
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertFalse(user.is_staff)
+
+
+    def test_changed_user_is_revoked_until_refresh(self):
+        access = self.refresh.access_token
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+        # NEW ACCESS TOKEN IN THE SAME SECOND IS ACCEPTED, WITH NEW CLAIMS
+        response = self.refresh_token()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.authenticate(response.json()["access"]).is_staff)
+
+
+    def test_inactive_user(self):
+        access = self.refresh.access_token
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+
+    @override_settings(JWT_STATELESS_AUTH=False)
+    def test_refresh_without_stateless_auth_reads_no_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh_token().status_code, 200)
+        self.assertFalse([query for query in queries if UserBase._meta.db_table in query["sql"]])
+
+
+
+class TokenBlacklistTestCase(TestCase):
+    """
+        Reused rotated refresh token is rejected (from memory in this
+        process, from db in others), expired tokens pruned in batches
+    """
+    def setUp(self):
+        UserBase.objects.create_user("+998901234567", "pass1234", is_active = True)
+        self.user = UserBase.objects.get()
+        patcher = mock.patch.object(tokens, "_blacklisted_jtis", OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def refresh_token(self, refresh):
+        return self.client.post("/api/v1/auth/token/refresh/", {"refresh": str(refresh)})
+
+
+    def test_reused_rotated_token_is_rejected(self):
+        refresh = UserRefreshToken.for_user(self.user)
+        response = self.refresh_token(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_token(response.json()["refresh"]).status_code, 200)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh_token(refresh).status_code, 401)
+        # OTHER PROCESS (NOTHING IN MEMORY) -> FROM DB
+        tokens._blacklisted_jtis.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresh_token(refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(refresh).status_code, 401)
+
+
+    def test_prune_in_batches(self):
+        now = timezone.now()
+        for number in range(7):
+            expires_at = now - timedelta(days = 1) if number < 5 else now + timedelta(days = 1)
+            token = OutstandingToken.objects.create(
+                user = self.user, jti = f"jti-{number}", token = "token", created_at = now - timedelta(days = 2), expires_at = expires_at
+            )
+            if number % 2:
+                BlacklistedToken.objects.create(token = token)
+
+        output = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("prune_token_blacklist", batch_size = 2, stdout = output)
+        self.assertIn("5 expired tokens deleted.", output.getvalue())
+        self.assertEqual(sorted(OutstandingToken.objects.values_list("jti", flat = True)), ["jti-5", "jti-6"])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        # 2 + 2 + 1 TOKENS, ONE DELETE OF OutstandingToken PER BATCH
+        delete = f'DELETE FROM "{OutstandingToken._meta.db_table}"'
+        deletes = [query for query in queries if query["sql"].startswith(delete)]
+        self.assertEqual(len(deletes), 3)
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import USER_CLAIM_FIELDS
+
+
+# TIME (FLOAT SECONDS) WHEN CLAIMS WERE READ FROM DB, iat HAS WHOLE SECONDS
+# AND ACCESS TOKEN MADE BY REFRESH KEEPS iat OF THE REFRESH TOKEN (LOGIN)
+CLAIMS_AT_CLAIM = "claims_at"
+
+
+def set_user_claims(token, user):
+    for field in USER_CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[CLAIMS_AT_CLAIM] = time.time()
+
+
+
+# JTI OF TOKENS BLACKLISTED OR FOUND IN BLACKLIST BY THIS PROCESS
+_blacklisted_jtis = OrderedDict()
+_blacklisted_lock = threading.Lock()
+
+
+def remember_blacklisted(jti):
+    """
+        Bounded by TOKEN_BLACKLIST_CACHE_SIZE, least recently seen jti goes
+        first. Forgotten jti is still found in db, only slower.
+    """
+    with _blacklisted_lock:
+        _blacklisted_jtis[jti] = None
+        _blacklisted_jtis.move_to_end(jti)
+        while len(_blacklisted_jtis) > settings.TOKEN_BLACKLIST_CACHE_SIZE:
+            _blacklisted_jtis.popitem(last = False)
+
+
+
+def is_remembered_blacklisted(jti):
+    with _blacklisted_lock:
+        if jti not in _blacklisted_jtis:
+            return False
+        _blacklisted_jtis.move_to_end(jti)
+        return True
+
+
+
+class UserRefreshToken(RefreshToken):
+    """
+        Refresh token with USER_CLAIM_FIELDS, access token made from it
+        gets the same claims.
+        Reused (rotated) refresh tokens are rejected from memory, without
+        query to token_blacklist. Only that is saved: a normal refresh (not
+        blacklisted token) still has its one indexed jti query, it is not
+        cached, else a token blacklisted by other process would be accepted
+        here for a while.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if is_remembered_blacklisted(jti):
+            raise TokenError(_("Token is blacklisted"))
+        try:
+            # BLACKLISTED BY OTHER PROCESS
+            super().check_blacklist()
+        except TokenError:
+            remember_blacklisted(jti)
+            raise
+
+
+    def blacklist(self):
+        result = super().blacklist()
+        remember_blacklisted(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+
+def get_revocation_key(user_id):
+    return f"token_revoked:{user_id}"
+
+
+
+def revoke_user_tokens(user_id):
+    """
+        Access tokens of user issued till now are not accepted by stateless
+        auth. Kept only for ACCESS_TOKEN_LIFETIME, older access tokens are
+        expired anyway and refresh reads user from db again.
+        Cache must be shared by all processes (CACHE_URL) for this.
+    """
+    timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds() + settings.SIMPLE_JWT.get("LEEWAY", 0)
+    cache.set(get_revocation_key(user_id), time.time(), timeout = int(timeout) + 1)
+
+
+
+def is_token_revoked(token):
+    """
+        Claims read from db before (or at) revocation -> old claims.
+        Compared with sub-second precision (claims_at), so token refreshed
+        in the same second after the change is accepted.
+    """
+    revoked_at = cache.get(get_revocation_key(token[api_settings.USER_ID_CLAIM]))
+    return revoked_at is not None and token.get(CLAIMS_AT_CLAIM, 0) <= revoked_at
@@ -3,6 +3,7 @@ import re
 
 from backend.account.models import UserBase
 from backend.account.validators import validate_uzb_phone_number
+from backend.api.v1.viewsets.serializers import ImageVariantsField
 from backend.api.v1.viewsets.utils import remove_image
 from backend.api.v1.viewsets.validators import validate_username
 from rest_framework import serializers
@@ -75,9 +76,10 @@ class MyAccountSerializer(serializers.ModelSerializer):
         PROFILE & EDIT USHIN SERIALIZER OK :)
     """
     first_name = serializers.CharField(validators = [validate_username])
+    avatar_variants = ImageVariantsField(source = "avatar")
     class Meta:
         model = UserBase
-        fields = ("first_name", "phone_number", "avatar", "created_at", "updated_at")
+        fields = ("first_name", "phone_number", "avatar", "avatar_variants", "created_at", "updated_at")
     
     
     def update(self, instance, validated_data):
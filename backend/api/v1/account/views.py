@@ -1,10 +1,16 @@
 from backend.account.models import UserBase
+from backend.account.tokens import UserRefreshToken, set_user_claims
 from backend.api.v1.viewsets.permissions import IsOwnerOfProfile
-from backend.restaurant.models import Feedback
+from backend.api.v1.viewsets.throttles import SCOPED_THROTTLE_CLASSES
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
 from rest_framework import generics, status, views
 from rest_framework.response import Response
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
+                                                  TokenRefreshSerializer)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from .serializers import (MyAccountSerializer, PhoneTokenVerifySerializer,
                           ResendPhoneNumberSerializer, UserSerializer)
@@ -18,12 +24,16 @@ class UserSignUpApiView(generics.CreateAPIView):
     """
     queryset = UserBase.objects.all()
     serializer_class = UserSerializer
+    # NO AUTHENTICATION BEFORE THROTTLE, Authorization: Basic WOULD HASH A PASSWORD
+    authentication_classes = []
+    throttle_classes = SCOPED_THROTTLE_CLASSES
+    throttle_scope = "signup"
 
     def create(self, request, *args, **kwargs):
        serializer = self.get_serializer(data = request.data)
        serializer.is_valid(raise_exception = True)
        user = serializer.save()
-       refresh = RefreshToken.for_user(user)
+       refresh = UserRefreshToken.for_user(user)
        return Response(
         {
             "refresh": str(refresh),
@@ -39,6 +49,9 @@ class PhoneTokenVerifyApiView(views.APIView):
     VERIFY PHONE TOKEN API VIEW :)
     """
     serializer_class = PhoneTokenVerifySerializer
+    authentication_classes = []
+    throttle_classes = SCOPED_THROTTLE_CLASSES
+    throttle_scope = "otp"
 
     def put(self, request):
         serializer = self.serializer_class(data = request.data)
@@ -47,7 +60,7 @@ class PhoneTokenVerifyApiView(views.APIView):
         phone_token = serializer.validated_data.get("token")
         account = verify_token(token=phone_token, phone_number=phone_number)
         if account:
-            refresh = RefreshToken.for_user(account)
+            refresh = UserRefreshToken.for_user(account)
             return Response(
                 {
                     "refresh": str(refresh),
@@ -63,6 +76,10 @@ class PhoneTokenVerifyApiView(views.APIView):
 
 # RESEND AGAIN API VIEW
 class ResendPhoneNumberApiView(views.APIView):
+    authentication_classes = []
+    throttle_classes = SCOPED_THROTTLE_CLASSES
+    throttle_scope = "otp"
+
     def post(self, request):
         serializer = ResendPhoneNumberSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -101,10 +118,57 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         WE ADD EXTRA FIELD FOR FEEDBACK 
         AND ALSO IN SETTINGS CHANGE DEFAULT CHECK OUT
     """
+    token_class = UserRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        is_feedback = Feedback.objects.filter(customer = user).exists()
-        token['is_feedback'] = is_feedback
+        # FLAG IS KEPT BY FEEDBACK SIGNALS, NO QUERY ON EVERY LOGIN
+        token['is_feedback'] = user.has_feedback
         return token
 # END OUR CUSTOM TOKENOBTAINPAIRSERIALIZER
+
+
+# LOGIN (TOKEN OBTAIN PAIR) API VIEW
+class MyTokenObtainPairView(TokenObtainPairView):
+    """
+        Login checks password hash, so it is throttled per IP
+    """
+    throttle_classes = SCOPED_THROTTLE_CLASSES
+    throttle_scope = "login"
+# END LOGIN (TOKEN OBTAIN PAIR) API VIEW
+
+
+# OUR CUSTOM TOKENREFRESHSERIALIZER
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+        JWT_STATELESS_AUTH = True
+        Claims of user (is_active, is_superuser ...) are read from db on
+        every refresh, so stateless access tokens are never older than
+        ACCESS_TOKEN_LIFETIME. Inactive user gets no new access token.
+        Else user is read by JWTAuthentication on every request anyway,
+        refresh is the same as in simplejwt (no user query).
+    """
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        if not settings.JWT_STATELESS_AUTH:
+            return super().validate(attrs)
+        refresh = self.token_class(attrs["refresh"])
+        user = UserBase.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).only("id", "is_active", "is_staff", "is_superuser").first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        set_user_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+# END OUR CUSTOM TOKENREFRESHSERIALIZER
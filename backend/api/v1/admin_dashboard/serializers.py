@@ -1,13 +1,14 @@
+import os
 import re
 
 import pytz
 from backend.account.models import UserBase
 from backend.api.v1.product.serializers import IngredientSerializer
 from backend.api.v1.viewsets.utils import remove_image
+from backend.product.catalog import CATALOG_FORMATS
 from backend.product.models import Category, Ingredient, Product
 from backend.restaurant.models import Feedback, Media, Restaurant
 from django.db import transaction
-from django.utils import timezone
 from rest_framework import serializers
 
 
@@ -89,15 +90,9 @@ class ProductUpdateSerializer(serializers.ModelSerializer):
         
         with transaction.atomic():
             instance.save()
-            # UPDATE OR CREATE THE INGREDIENTS ASSOCIATED WITH THE PRODUCT
-            for ingredient_data in ingredients_data:
-                ingredient_name = ingredient_data.get("name").lower()
-                ingredient, _ = Ingredient.objects.get_or_create(name = ingredient_name)
-                
-                instance.ingredients.add(ingredient)
-            # REMOVE OLD INGREDIENTS
-            current_ingredient_names = [ingredient_data.get("name").lower() for ingredient_data in ingredients_data]
-            instance.ingredients.set(Ingredient.objects.filter(name__in = current_ingredient_names))
+            # CREATE MISSING INGREDIENTS AND WRITE ONLY DIFFERENCE OF M2M (ADDED & REMOVED)
+            ingredients = Ingredient.objects.resolve(ingredient_data.get("name") for ingredient_data in ingredients_data)
+            instance.ingredients.set(ingredients)
         return instance
 # END PRODUCT UPDATE SERIALIZER
 
@@ -108,18 +103,40 @@ class CustomerSerializer(serializers.Serializer):
     avatar = serializers.ImageField()
 
 
+REVIEW_TIMEZONE = pytz.timezone("Asia/Tashkent")
+REVIEW_TIME_FORMAT = "%d %B %Y %H:%M:%S"
+
+
+def format_review_time(moment):
+    return moment.astimezone(REVIEW_TIMEZONE).strftime(REVIEW_TIME_FORMAT)
+
+
+
+class ReviewListSerializer(serializers.ListSerializer):
+    """
+        Page of reviews, created_at of all rows formatted here in one loop
+        (rows give raw datetime), timezone object is made once per process.
+    """
+    def to_representation(self, data):
+        rows = super().to_representation(data)
+        for row in rows:
+            row["created_at"] = format_review_time(row["created_at"])
+        return rows
+
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     customer = CustomerSerializer()
+    created_at = serializers.ReadOnlyField()
     class Meta:
         model = Feedback
         fields = ('customer', 'rating', 'feedback', 'created_at')
+        list_serializer_class = ReviewListSerializer
 
     def to_representation(self, instance):
-        tz = pytz.timezone("Asia/Tashkent")
         data = super().to_representation(instance)
-        localized_time = timezone.localtime(instance.created_at, tz)
-        created_at = localized_time.strftime("%d %B %Y %H:%M:%S")
-        data['created_at'] = created_at
+        if not isinstance(self.parent, ReviewListSerializer):
+            data['created_at'] = format_review_time(data['created_at'])
         return data
 # END REVIEW SERIALIZERS
 
@@ -183,3 +200,15 @@ class PasswordResetSerializer(serializers.Serializer):
 # END ADMIN PROFILE SERIALIZER
 
 
+# CATALOG IMPORT SERIALIZER
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=CATALOG_FORMATS, required=False)
+
+    def validate(self, attrs):
+        # BY FILE EXTENSION IF NOT GIVEN
+        if not attrs.get("file_format"):
+            extension = os.path.splitext(attrs["file"].name)[1].lstrip(".").lower()
+            attrs["file_format"] = extension if extension in CATALOG_FORMATS else "jsonl"
+        return attrs
+# END CATALOG IMPORT SERIALIZER
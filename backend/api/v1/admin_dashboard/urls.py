@@ -16,6 +16,10 @@ urlpatterns = [
     path('product/edit_and_detail/<str:slug>/', views.ProductViewSet.as_view({'put': 'update', 'get': 'retrieve'}), name = 'product_edit_detail'),
     path('product/destroy/<str:slug>/', views.ProductViewSet.as_view({'delete': 'destroy'}), name = 'product_destroy'),
     # END PRODUCT
+    # CATALOG IMPORT & EXPORT
+    path('catalog/export/', views.CatalogViewSet.as_view({'get': 'export_catalog'}), name = 'catalog_export'),
+    path('catalog/import/', views.CatalogViewSet.as_view({'post': 'import_catalog'}), name = 'catalog_import'),
+    # END CATALOG IMPORT & EXPORT
     # REVIEWS
     path('reviews/', views.ReviewAPiView.as_view({'get': 'list'}), name = "review_list"),
     # END REVIEWS
@@ -1,20 +1,36 @@
+import io
+
+from backend.account.authentication import get_user_instance
 from backend.account.models import UserBase
 from backend.api.v1.product.serializers import (CategorySerializer,
+                                                ProductReadSerializer,
                                                 ProductSerializer)
+from backend.api.v1.product.utils import PRODUCT_SPARSE_FIELD_SOURCES
 from backend.api.v1.restaurant.serializers import (AddressSerializer,
                                                    RestaurantSerializer)
+from backend.api.v1.viewsets.filters import ProductSearchFilter, ReviewFilter
+from backend.api.v1.viewsets.mixins import (SparseFieldsetMixin,
+                                            StreamingListMixin)
+from backend.api.v1.viewsets.paginations import (ProductCursorPagination,
+                                                ReviewCursorPagination)
 from backend.api.v1.viewsets.permissions import (AdminDashboardPermission,
                                                  IsOwnerOfProfile)
-from backend.api.v1.viewsets.utils import remove_image
+from backend.api.v1.viewsets.utils import remove_image, streaming_response
+from backend.product.catalog import (CATALOG_FORMATS, export_catalog,
+                                     import_catalog)
+from backend.product.images import get_image_file_names
 from backend.product.models import Category, Ingredient, Product
 from backend.restaurant.models import Address, Feedback, Media, Restaurant
+from backend.restaurant.utils import get_qr_code_file_names
+from backend.tasks.media import delete_media_files
+from django.db import transaction
 from rest_framework import (filters, generics, permissions, response, status,
                             viewsets)
 from rest_framework.decorators import action
 
-from .serializers import (CategoryUpdateSerializer, CompanyMediaSerializer,
-                          PasswordResetSerializer, ProductUpdateSerializer,
-                          ReviewSerializer)
+from .serializers import (CatalogImportSerializer, CategoryUpdateSerializer,
+                          CompanyMediaSerializer, PasswordResetSerializer,
+                          ProductUpdateSerializer, ReviewSerializer)
 
 
 # CATEGORY API VIEW SIDE
@@ -53,18 +69,22 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 # PRODUCT & INGREDIENTS API VIEW
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(StreamingListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().select_related("category").prefetch_related('ingredients')
     serializer_class = ProductSerializer
     permission_classes = [AdminDashboardPermission]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['category__name', 'ingredients__name', 'name']
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductSearchFilter]
+    sparse_field_sources = PRODUCT_SPARSE_FIELD_SOURCES
+    sparse_prefetch_fields = ("ingredients",)
     lookup_field = "slug"
 
 
     def get_serializer_class(self):
         if self.request.method == 'PUT':
             return ProductUpdateSerializer
+        if self.request.method == 'GET':
+            return ProductReadSerializer
         return ProductSerializer
 
 
@@ -84,19 +104,59 @@ class ProductViewSet(viewsets.ModelViewSet):
 # END PRODUCT & INGREDIENTS API VIEW
 
 
+# CATALOG IMPORT & EXPORT API VIEW
+class CatalogViewSet(viewsets.ViewSet):
+    """
+        Whole catalog (products with categories & ingredients) as csv or jsonl.
+        Export is streamed, import reads uploaded file by chunks and gives
+        per row errors.
+    """
+    permission_classes = [AdminDashboardPermission]
+    serializer_class = CatalogImportSerializer
+
+    @action(detail=False, methods=['get'])
+    def export_catalog(self, request, *args, **kwargs):
+        # NOT ?format=... , DRF USES IT FOR RENDERERS
+        file_format = request.query_params.get("file_format", "jsonl")
+        if file_format not in CATALOG_FORMATS:
+            return response.Response(
+                {"file_format": f"Choose one of: {', '.join(CATALOG_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        streaming = streaming_response(request, export_catalog(file_format), content_type=content_type)
+        streaming["Content-Disposition"] = f'attachment; filename="catalog.{file_format}"'
+        return streaming
+
+
+    @action(detail=False, methods=['post'])
+    def import_catalog(self, request, *args, **kwargs):
+        serializer = CatalogImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        report = import_catalog(lines, serializer.validated_data["file_format"])
+        return response.Response(report, status=status.HTTP_200_OK)
+# END CATALOG IMPORT & EXPORT API VIEW
+
+
 # REVIEW API VIEWS
-class ReviewAPiView(viewsets.ReadOnlyModelViewSet):
+class ReviewAPiView(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     """
         Review API View
     """
-    queryset = Feedback.objects.all().select_related('customer')
+    queryset = Feedback.objects.all().select_related('customer').only(
+        'rating', 'feedback', 'created_at', 'customer', 'customer__first_name', 'customer__avatar'
+    )
     serializer_class = ReviewSerializer
     permission_classes = [AdminDashboardPermission]
+    pagination_class = ReviewCursorPagination
+    filterset_class = ReviewFilter
 # END REVIEW API VIEWS
 
 
 # ADDRESS API VIEWS
-class AddressAPIViewSet(viewsets.ModelViewSet):
+class AddressAPIViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
     permission_classes = [AdminDashboardPermission]
@@ -118,7 +178,7 @@ class AddressAPIViewSet(viewsets.ModelViewSet):
 
 # RESTAURANT API VIEWS
 class RestaurantApiViewSet(viewsets.ModelViewSet):
-    queryset = Restaurant.objects.all()
+    queryset = Restaurant.objects.all().select_related("rating_summary")
     serializer_class = RestaurantSerializer
     permission_classes = [AdminDashboardPermission]
     lookup_field = "slug"
@@ -142,15 +202,15 @@ class RestaurantApiViewSet(viewsets.ModelViewSet):
             Bellow we gonna delete Restaurant & Media files
         """
         instance = self.get_object()
-        if instance.qr_code:
-            remove_image(instance.qr_code) # Remove qr_code images from Media
-        restaurant_images = instance.restaurant_images.all()
-        if restaurant_images:
-            for restaurant_media in restaurant_images:
-                if restaurant_media.image:
-                    # Remove media images which is referenced with restaurant
-                    remove_image(restaurant_media.image)
-        instance.delete()
+        # qr_code images (png & svg) and media images (with variants) of restaurant,
+        # removed from Media by worker in one task after commit
+        names = get_qr_code_file_names(instance.qr_code)
+        for image in instance.restaurant_images.exclude(image = "").exclude(image = None).values_list("image", flat = True):
+            names.extend(get_image_file_names(image))
+        with transaction.atomic():
+            instance.delete()
+            if names:
+                delete_media_files.enqueue(names)
         response_data = {"detail": "Successfully deleted."}
         return response.Response(response_data, status= status.HTTP_204_NO_CONTENT)
 # END RESTAURANT API VIEWS
@@ -185,7 +245,7 @@ class PasswordResetViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['put'])
     def reset_password(self, request, *args, **kwargs):
-        user = request.user
+        user = get_user_instance(request.user)
         serializer = PasswordResetSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         new_password = serializer.validated_data.get("new_password")
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from backend.api.v1.viewsets.paginations import ProductCursorPagination
+from backend.api.v1.viewsets.utils import (etag_matches, json_etag_response,
+                                           make_etag, public_view)
+from backend.product.cache import aget_menu_cache_key
+from backend.product.models import Category
+from backend.product.snapshot import (MENU_SNAPSHOT_ALL, aget_menu_snapshot,
+                                      get_snapshot_content)
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+from . import views
+from .serializers import CategoryReadSerializer
+from .utils import SNAPSHOT_QUERY_PARAM
+
+"""
+    ASYNC_CLIENT_VIEWS = True (ASGI, uvicorn): client read endpoints without
+    DRF, cache & ORM are awaited so one worker keeps many connections while
+    they wait for cache/db. JSON, ETag and cache keys are the same as in
+    sync views (views.py), so both share one cache.
+    /menu/ first page (the most requests) is served from that cache here,
+    only a cache miss (and next pages, search, ?fields=) is made by the
+    sync view in a thread, it fills the cache for the next requests.
+"""
+
+category_list_view = views.CategoryListApiView.as_view()
+product_list_view = views.ProductListApiView.as_view()
+
+
+@public_view
+async def category_list(request):
+    """
+        /food/categories/ -> same as CategoryListApiView
+    """
+    if request.GET.get("fields"):
+        return await sync_to_async(category_list_view)(request)
+
+    cache_key = await aget_menu_cache_key("categories", request.build_absolute_uri("/"), None)
+    cached = await cache.aget(cache_key)
+    if cached is None:
+        categories = [category async for category in Category.objects.filter(is_active = True)]
+        data = CategoryReadSerializer(categories, many = True, context = {"request": request}).data
+        cached = (make_etag(data), data)
+        await cache.aset(cache_key, cached, settings.MENU_CACHE_TIMEOUT)
+
+    etag, data = cached
+    return json_etag_response(request, data, etag)
+
+
+
+@public_view
+async def product_list(request):
+    """
+        /food/menu/ -> same as ProductListApiView: first page from cache,
+        ?all=1 menu snapshot without ORM and serializer.
+    """
+    if request.GET.get(SNAPSHOT_QUERY_PARAM) in ("1", "true"):
+        return await snapshot_list(request)
+
+    params = request.GET
+    paginator = ProductCursorPagination()
+    if params.get(paginator.cursor_query_param) or params.get("search") is not None or params.get("fields"):
+        return await sync_to_async(product_list_view)(request)
+
+    category = params.get("category") or None
+    # page_size IS READ THE SAME WAY AS IN THE SYNC VIEW (query_params)
+    page_size = paginator.get_page_size(SimpleNamespace(query_params = params))
+    cache_key = await aget_menu_cache_key("menu", request.build_absolute_uri("/"), category, None, page_size, None, None)
+    cached = await cache.aget(cache_key)
+    if cached is None:
+        return await sync_to_async(product_list_view)(request)
+
+    etag, data = cached
+    if category is not None and not data["results"]:
+        return not_found(request)
+    return json_etag_response(request, data, etag)
+
+
+
+async def snapshot_list(request):
+    category = request.GET.get("category") or None
+    cache_key = await aget_menu_cache_key("snapshot", category)
+    snapshot = await cache.aget(cache_key)
+    if snapshot is None:
+        snapshot = await aget_menu_snapshot(category or MENU_SNAPSHOT_ALL)
+        await cache.aset(cache_key, snapshot, settings.MENU_CACHE_TIMEOUT)
+
+    if category is not None and (snapshot is None or snapshot[0] == b"[]"):
+        return not_found(request)
+
+    content, etag = get_snapshot_content(snapshot, request)
+    if etag_matches(request, etag):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    return HttpResponse(content, content_type="application/json", headers={"ETag": etag})
+
+
+
+def not_found(request):
+    return json_etag_response(request, {'message': 'No products found for the specified category.'}, status = 404)
@@ -1,18 +1,22 @@
+from backend.api.v1.viewsets.serializers import (FastReadOnlySerializer,
+                                                 ImageVariantsField,
+                                                 SparseFieldsSerializerMixin)
 from backend.product.models import Category, Ingredient, Product
 from django.db import transaction
 from rest_framework import serializers
 
 
 # CATEGORY SERIALIZER
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
         THIS CATEGORY LIST API AND ALSO CREATE CATEGORY.
         WHEN ADD NEW CATEGORY WE GONNA VALIDATE SOME FIELD 
         BEFORE SAVING TO DATABASE OK :)
     """
+    image_variants = ImageVariantsField(source = "image")
     class Meta:
         model = Category
-        fields = ("id", "name", "slug", "image", "is_active")
+        fields = ("id", "name", "slug", "image", "image_variants", "is_active")
         read_only_fields = ("slug",)
 
 
@@ -37,18 +41,23 @@ class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name")
+        extra_kwargs = {
+            # EXISTING INGREDIENT IS REUSED, NOT AN ERROR
+            "name": {"validators": []},
+        }
 
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
         ProductSerializer for List, create and retrieve
     """
     category = serializers.SlugRelatedField(slug_field='name', queryset = Category.objects.all())
     ingredients = IngredientSerializer(many = True)
+    image_variants = ImageVariantsField(source = "image")
     class Meta:
         model = Product
-        fields = ("category", "name", "slug", "description", "original_price", "image", "is_active", 'ingredients')
+        fields = ("category", "name", "slug", "description", "original_price", "image", "image_variants", "is_active", 'ingredients')
         extra_kwargs = {
             "slug": {"read_only": True},
         }
@@ -56,20 +65,105 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        ingredients_data = representation.pop("ingredients")
-        representation["ingredients"] = [ingredient['name'] for ingredient in ingredients_data]
+        if "ingredients" in representation:
+            ingredients_data = representation.pop("ingredients")
+            representation["ingredients"] = [ingredient['name'] for ingredient in ingredients_data]
         return representation
 
 
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients", [])
-        image = validated_data.get("image", "product_images/no-food.webp")
+        image = validated_data.pop("image", None) or "product_images/no-food.webp"
   
         with transaction.atomic():
             product = Product.objects.create(image=image, **validated_data)
-            for ingredient in ingredients:
-                ingredient_name = ingredient.get("name").lower()
-                ingredient, _ = Ingredient.objects.get_or_create(name = ingredient_name)
-                product.ingredients.add(ingredient)
+            product.ingredients.add(*Ingredient.objects.resolve(ingredient.get("name") for ingredient in ingredients))
         return product
 
+
+
+# FAST READ ONLY SERIALIZERS FOR LISTS (GET)
+PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class CategoryReadSerializer(FastReadOnlySerializer):
+    """
+        Same json as CategorySerializer, only for reading
+    """
+    class Meta:
+        fields = CategorySerializer.Meta.fields
+
+
+    def from_values(self, queryset, fields):
+        columns = ["image" if field == "image_variants" else field for field in fields]
+        return [self.make_category(row, fields) for row in queryset.values(*dict.fromkeys(columns))]
+
+
+    def from_object(self, category, fields):
+        row = {field: getattr(category, field) for field in fields if field != "image_variants"}
+        if "image_variants" in fields:
+            row["image"] = category.image
+        return self.make_category(row, fields)
+
+
+    def make_category(self, row, fields):
+        data = {field: row.get(field) for field in fields}
+        if "image_variants" in data:
+            data["image_variants"] = self.get_image_variant_urls(row["image"])
+        if "image" in data:
+            data["image"] = self.get_image_url(row["image"])
+        return data
+
+
+
+class ProductReadSerializer(FastReadOnlySerializer):
+    """
+        Same json as ProductSerializer, but without nested IngredientSerializer
+        and DRF fields for every row. Queryset -> one values() query + one query
+        for ingredient names, list of products -> prefetched ingredients are used.
+    """
+    class Meta:
+        fields = ProductSerializer.Meta.fields
+
+
+    def from_values(self, queryset, fields):
+        sources = {"category": "category__name", "image_variants": "image"}
+        columns = ["id"] + [sources.get(field, field) for field in fields if field != "ingredients"]
+        rows = list(queryset.values(*dict.fromkeys(columns)))
+
+        ingredients = {}
+        if "ingredients" in fields:
+            through = Product.ingredients.through.objects.filter(product_id__in = [row["id"] for row in rows])
+            # SAME ORDER AS PREFETCHED INGREDIENTS (BY INGREDIENT)
+            for product_id, name in through.order_by("ingredient_id").values_list("product_id", "ingredient__name"):
+                ingredients.setdefault(product_id, []).append(name)
+
+        data = []
+        for row in rows:
+            row["category"] = row.pop("category__name", None)
+            row["ingredients"] = ingredients.get(row["id"], [])
+            data.append(self.make_product(row, fields))
+        return data
+
+
+    def from_object(self, product, fields):
+        row = {field: getattr(product, field) for field in fields if field not in ("category", "ingredients", "image_variants")}
+        if "image_variants" in fields:
+            row["image"] = product.image
+        if "category" in fields:
+            row["category"] = product.category.name
+        if "ingredients" in fields:
+            row["ingredients"] = [ingredient.name for ingredient in product.ingredients.all()]
+        return self.make_product(row, fields)
+
+
+    def make_product(self, row, fields):
+        data = {field: row.get(field) for field in fields}
+        if "original_price" in data and data["original_price"] is not None:
+            data["original_price"] = PRICE_FIELD.to_representation(data["original_price"])
+        if "image_variants" in data:
+            data["image_variants"] = self.get_image_variant_urls(row["image"])
+        if "image" in data:
+            data["image"] = self.get_image_url(data["image"])
+        return data
+# END FAST READ ONLY SERIALIZERS FOR LISTS (GET)
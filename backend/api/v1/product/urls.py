@@ -1,8 +1,18 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+if settings.ASYNC_CLIENT_VIEWS:
+    category_list = async_views.category_list
+    product_list = async_views.product_list
+else:
+    category_list = views.CategoryListApiView.as_view()
+    product_list = views.ProductListApiView.as_view()
 
 urlpatterns = [
-    path('categories/', views.CategoryListApiView.as_view(), name = "category_list"),
-    path('menu/', views.ProductListApiView.as_view(), name = 'menu'),
+    path('categories/', category_list, name = "category_list"),
+    path('menu/', product_list, name = 'menu'),
+    path('menu/grouped/', views.GroupedMenuApiView.as_view(), name = 'grouped_menu'),
+    path('menu/changes/', views.MenuChangesApiView.as_view(), name = 'menu_changes'),
 ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+# PRODUCT SERIALIZER FIELD -> MODEL FIELDS FOR ?fields=... (.only())
+PRODUCT_SPARSE_FIELD_SOURCES = {
+    "category": ("category__name",),
+    "image_variants": ("image",),
+    "ingredients": (),
+}
+CATEGORY_SPARSE_FIELD_SOURCES = {
+    "image_variants": ("image",),
+}
+
+# /menu/?all=1 -> WHOLE (CATEGORY) MENU FROM SNAPSHOT, WITHOUT IT FIRST CURSOR PAGE
+SNAPSHOT_QUERY_PARAM = "all"
+
+
+# DELTA SYNC TOKEN, MICROSECONDS SINCE EPOCH (UTC)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def make_sync_token(moment):
+    delta = moment - EPOCH
+    return str((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+
+def parse_sync_token(token):
+    """
+        return datetime of token or None if token is not valid
+    """
+    if not token.isdigit():
+        return None
+    try:
+        return EPOCH + timedelta(microseconds = int(token))
+    except OverflowError:
+        return None
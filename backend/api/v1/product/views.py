@@ -1,30 +1,68 @@
-from backend.product.models import Category, Ingredient, Product
+from datetime import timedelta
+
+from backend.api.v1.viewsets.filters import ProductSearchFilter
+from backend.api.v1.viewsets.mixins import PublicReadMixin, SparseFieldsetMixin
+from backend.api.v1.viewsets.paginations import ProductCursorPagination
+from backend.api.v1.viewsets.utils import etag_matches, make_etag
+from backend.product.cache import get_menu_cache_key
+from backend.product.models import (Category, Ingredient, MenuTombstone,
+                                    Product)
+from backend.product.snapshot import (MENU_SNAPSHOT_ALL, get_menu_snapshot,
+                                      get_snapshot_content)
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
 from rest_framework import generics, response, status
 
-from .serializers import CategorySerializer, ProductSerializer
+from .serializers import CategoryReadSerializer, ProductReadSerializer
+from .utils import (CATEGORY_SPARSE_FIELD_SOURCES, SNAPSHOT_QUERY_PARAM,
+                    PRODUCT_SPARSE_FIELD_SOURCES, make_sync_token,
+                    parse_sync_token)
 
 
 # CLIENT WEB API
-class CategoryListApiView(generics.ListAPIView):
+class CategoryListApiView(PublicReadMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
         CATEGORY LIST API VIEW FOR CLIENT APP 
         RETURN QUERYSET OF CATEGORY IS_ACTIVE = TRUE
     """
-    serializer_class = CategorySerializer
+    serializer_class = CategoryReadSerializer
+    sparse_field_sources = CATEGORY_SPARSE_FIELD_SOURCES
 
     def get_queryset(self):
         queryset = Category.objects.filter(is_active = True)
         return queryset
 
 
+    def list(self, request, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        cache_key = get_menu_cache_key("categories", request.build_absolute_uri("/"), fields)
+        cached = cache.get(cache_key)
+        if cached is None:
+            data = super().list(request, *args, **kwargs).data
+            cached = (make_etag(data), data)
+            cache.set(cache_key, cached, settings.MENU_CACHE_TIMEOUT)
+
+        etag, data = cached
+        if etag_matches(request, etag):
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return response.Response(data, headers={"ETag": etag})
+
+
 
-class ProductListApiView(generics.ListAPIView):
+class ProductListApiView(PublicReadMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
         Product List Api View for client app
         return queryset of product if is_active = True
+        Paged by cursor, ?all=1 -> whole menu from snapshot (not paged)
     """
-    serializer_class = ProductSerializer
+    serializer_class = ProductReadSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductSearchFilter]
+    sparse_field_sources = PRODUCT_SPARSE_FIELD_SOURCES
+    sparse_prefetch_fields = ("ingredients",)
 
     def get_queryset(self):
         queryset = Product.objects.filter(is_active = True).select_related("category").defer(
@@ -65,17 +103,151 @@ class ProductListApiView(generics.ListAPIView):
 
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        #print(queryset.query)
+        params = request.query_params
+        if params.get(SNAPSHOT_QUERY_PARAM) in ("1", "true"):
+            # WHOLE MENU ASKED -> READY JSON FROM MENU SNAPSHOT, ORM AND SERIALIZER ARE NOT TOUCHED
+            return self.snapshot_list(request)
+
+        category = params.get("category") or None
+        cursor = params.get(self.paginator.cursor_query_param)
+        page_size = self.paginator.get_page_size(request)
+        search = params.get("search")
+        fields = self.get_sparse_fields()
+        # IMAGE URLS ARE ABSOLUTE SO HOST IS PART OF THE KEY
+        cache_key = get_menu_cache_key("menu", request.build_absolute_uri("/"), category, cursor, page_size, search, fields)
+        cached = cache.get(cache_key)
+        if cached is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if category is not None:
+                queryset = queryset.filter(category__slug = category)
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many = True)
+            data = self.get_paginated_response(serializer.data).data
+            cached = (make_etag(data), data)
+            cache.set(cache_key, cached, settings.MENU_CACHE_TIMEOUT)
+
+        etag, data = cached
+        if category is not None and cursor is None and search is None and not data["results"]:
+            return self.not_found()
+
+        if etag_matches(request, etag):
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return response.Response(data, headers={"ETag": etag})
+
+
+    def snapshot_list(self, request):
         category = request.query_params.get("category") or None
-        if category is not None:
-            queryset = queryset.filter(category__slug = category)
-
-            if not queryset.exists():
-                return response.Response(
-                    {'message': 'No products found for the specified category.'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-         
-        serializer = self.get_serializer(queryset, many = True)
-        return response.Response(serializer.data)
\ No newline at end of file
+        cache_key = get_menu_cache_key("snapshot", category)
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            snapshot = get_menu_snapshot(category or MENU_SNAPSHOT_ALL)
+            cache.set(cache_key, snapshot, settings.MENU_CACHE_TIMEOUT)
+
+        if category is not None and (snapshot is None or snapshot[0] == b"[]"):
+            return self.not_found()
+
+        content, etag = get_snapshot_content(snapshot, request)
+        if etag_matches(request, etag):
+            return HttpResponseNotModified(headers={"ETag": etag})
+        return HttpResponse(content, content_type="application/json", headers={"ETag": etag})
+
+
+    def not_found(self):
+        return response.Response(
+            {'message': 'No products found for the specified category.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+
+
+class GroupedMenuApiView(PublicReadMixin, generics.GenericAPIView):
+    """
+        Active categories with their active products inside, one request
+        instead of categories + menu?category=... for every category.
+        Always 3 queries (categories, products, ingredients) and cached
+        as one unit with the menu version.
+    """
+    serializer_class = ProductReadSerializer
+
+    def get(self, request, *args, **kwargs):
+        cache_key = get_menu_cache_key("grouped", request.build_absolute_uri("/"))
+        cached = cache.get(cache_key)
+        if cached is None:
+            data = self.get_grouped_menu()
+            cached = (make_etag(data), data)
+            cache.set(cache_key, cached, settings.MENU_CACHE_TIMEOUT)
+
+        etag, data = cached
+        if etag_matches(request, etag):
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return response.Response(data, headers={"ETag": etag})
+
+
+    def get_grouped_menu(self):
+        context = self.get_serializer_context()
+        categories = CategoryReadSerializer(
+            Category.objects.filter(is_active = True).order_by("name"), many = True, context = context
+        ).data
+        products = ProductReadSerializer(
+            Product.objects.filter(is_active = True, category__is_active = True).order_by("created_at", "id"),
+            many = True, context = context
+        ).data
+
+        # CATEGORY NAME IS UNIQUE, PRODUCT GIVES CATEGORY NAME
+        products_by_category = {}
+        for product in products:
+            products_by_category.setdefault(product["category"], []).append(product)
+        for category in categories:
+            category["products"] = products_by_category.get(category["name"], [])
+        return categories
+
+
+
+class MenuChangesApiView(PublicReadMixin, generics.GenericAPIView):
+    """
+        Delta sync for clients which keep the menu locally.
+        /menu/changes/?since=<token> -> products & categories created, updated
+        or deactivated (is_active = false) after token, slugs/ids of deleted
+        ones and a new token for the next call. Apply "deleted" first.
+
+        Without since (or too old since) full active menu is returned
+        with "full": true, so client replaces its copy.
+    """
+    serializer_class = ProductReadSerializer
+
+    def get(self, request, *args, **kwargs):
+        # ROWS COMMITTED A BIT LATER THAN THEIR updated_at ARE NOT LOST, SAME ROW CAN COME TWICE
+        now = timezone.now()
+        token = make_sync_token(now - timedelta(seconds = settings.MENU_SYNC_OVERLAP_SECONDS))
+
+        since = request.query_params.get("since")
+        if since is not None:
+            since = parse_sync_token(since)
+            if since is None:
+                return response.Response({"since": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since is None or since < now - timedelta(days = settings.MENU_SYNC_TOMBSTONE_DAYS):
+            return response.Response({"token": token, "full": True, **self.get_full_menu()})
+        return response.Response({"token": token, "full": False, **self.get_changes(since)})
+
+
+    def get_full_menu(self):
+        context = self.get_serializer_context()
+        return {
+            "categories": CategoryReadSerializer(Category.objects.filter(is_active = True), many = True, context = context).data,
+            "products": ProductReadSerializer(Product.objects.filter(is_active = True), many = True, context = context).data,
+            "deleted": {"categories": [], "products": []},
+        }
+
+
+    def get_changes(self, since):
+        context = self.get_serializer_context()
+        tombstones = MenuTombstone.objects.filter(deleted_at__gt = since)
+        return {
+            "categories": CategoryReadSerializer(Category.objects.filter(updated_at__gt = since), many = True, context = context).data,
+            "products": ProductReadSerializer(Product.objects.filter(updated_at__gt = since), many = True, context = context).data,
+            "deleted": {
+                "categories": list(tombstones.filter(kind = "category").values_list("object_id", flat = True)),
+                "products": list(tombstones.filter(kind = "product").values_list("slug", flat = True)),
+            },
+        }
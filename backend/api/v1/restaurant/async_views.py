@@ -0,0 +1,38 @@
+from backend.api.v1.viewsets.utils import (json_etag_response, make_etag,
+                                           public_view)
+from backend.restaurant.models import Address, Restaurant
+
+from .serializers import AddressSerializer, RestaurantSerializer
+
+"""
+    ASYNC_CLIENT_VIEWS = True (ASGI, uvicorn): same json as
+    RestaurantReadOnlyViewSet & AddressReadOnlyViewSet, with async ORM.
+"""
+
+
+@public_view
+async def restaurant(request):
+    """
+        /restaurant/ -> same as RestaurantReadOnlyViewSet.restaurant
+    """
+    try:
+        restaurant = await Restaurant.objects.select_related("rating_summary").prefetch_related("restaurant_images").aget()
+    except Restaurant.DoesNotExist:
+        return json_etag_response(request, {"error": "no restaurant found"}, status = 404)
+    # PREFETCHED, SERIALIZER DOES NOT QUERY
+    serializer = RestaurantSerializer(restaurant, many = False, context = {'request': request})
+    data = {'restaurant': serializer.data}
+    return json_etag_response(request, data, make_etag(data))
+
+
+
+@public_view
+async def addresses(request):
+    """
+        /restaurant/addresses/ -> same as AddressReadOnlyViewSet.addresses
+    """
+    addresses = [address async for address in Address.objects.filter(is_default = True)]
+    if not addresses:
+        return json_etag_response(request, {"error": "no addresses found"}, status = 404)
+    serializer = AddressSerializer(addresses, many = True)
+    return json_etag_response(request, {'addresses': serializer.data})
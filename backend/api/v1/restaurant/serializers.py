@@ -1,5 +1,9 @@
+from backend.api.v1.viewsets.serializers import ImageVariantsField
 from backend.api.v1.viewsets.utils import remove_image
-from backend.restaurant.models import Address, Feedback, Media, Restaurant
+from backend.restaurant.models import (Address, Feedback, Media,
+                                       RatingSummary, Restaurant)
+from backend.restaurant.utils import delete_qr_code, get_svg_name
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 
@@ -7,9 +11,10 @@ class MediaSerializer(serializers.ModelSerializer):
     """
         Restaurant Media Images Serializer ok :)
     """
+    image_variants = ImageVariantsField(source = "image")
     class Meta:
         model = Media
-        fields = ("id", "image", "alt_text", "is_feature")
+        fields = ("id", "image", "image_variants", "alt_text", "is_feature")
 
 
 
@@ -18,10 +23,12 @@ class RestaurantSerializer(serializers.ModelSerializer):
         Restaurant Serializer :)
     """
     qr_code = serializers.SerializerMethodField()
+    qr_code_svg = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
     restaurant_images = MediaSerializer(many = True, read_only = True)
     class Meta:
         model = Restaurant
-        fields = ("name", "slug", "about_us", "phone_number1", "phone_number2", "telegram_link", "instagram_link", "facebook_link", "domain_name", "qr_code", "created_at", "updated_at", "restaurant_images")
+        fields = ("name", "slug", "about_us", "phone_number1", "phone_number2", "telegram_link", "instagram_link", "facebook_link", "domain_name", "qr_code", "qr_code_svg", "rating", "created_at", "updated_at", "restaurant_images")
         extra_kwargs = {
             "qr_code": {'read_only': True},
             "slug": {'read_only': True},
@@ -47,7 +54,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
         new_domain_name = validated_data.get("domain_name")
         if new_domain_name and new_domain_name != instance.domain_name:
             if instance.qr_code:
-                remove_image(image=instance.qr_code)
+                delete_qr_code(instance.qr_code.name)
             instance.domain_name = new_domain_name
         instance.save()
         return instance
@@ -60,6 +67,25 @@ class RestaurantSerializer(serializers.ModelSerializer):
         return None
 
 
+    def get_rating(self, obj) -> dict:
+        """
+            From RatingSummary, feedbacks are not counted here
+        """
+        summary = getattr(obj, "rating_summary", None) or RatingSummary(restaurant = obj)
+        return {
+            "average": summary.average,
+            "count": summary.count,
+            "histogram": summary.histogram,
+        }
+
+
+    def get_qr_code_svg(self, obj) -> str:
+        request = self.context.get("request")
+        if obj.qr_code:
+            return request.build_absolute_uri(default_storage.url(get_svg_name(obj.qr_code.name)))
+        return None
+
+
 
 class AddressSerializer(serializers.ModelSerializer):
     """
@@ -114,7 +140,7 @@ class FeedBackSerializer(serializers.ModelSerializer):
     def validate(self, data):
         user = self.context['request'].user
         restaurant = data.get("restaurant")
-        existing_restaurant = Feedback.objects.filter(customer=user, restaurant=restaurant).exists()
+        existing_restaurant = Feedback.objects.filter(customer_id=user.pk, restaurant=restaurant).exists()
         if existing_restaurant:
             raise serializers.ValidationError("You have already submitted a rating for this restaurant.")
         return data
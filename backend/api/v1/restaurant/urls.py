@@ -1,9 +1,17 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+if settings.ASYNC_CLIENT_VIEWS:
+    restaurant = async_views.restaurant
+    addresses = async_views.addresses
+else:
+    restaurant = views.RestaurantReadOnlyViewSet.as_view({'get': 'restaurant'})
+    addresses = views.AddressReadOnlyViewSet.as_view({'get': 'addresses'})
 
 urlpatterns = [
-    path('', views.RestaurantReadOnlyViewSet.as_view({'get': 'restaurant'}), name = 'restaurant'),
-    path('addresses/', views.AddressReadOnlyViewSet.as_view({'get': 'addresses'}), name = 'addresses'),
+    path('', restaurant, name = 'restaurant'),
+    path('addresses/', addresses, name = 'addresses'),
     path('post_feedback/', views.FeedBackModelViewSetForClient.as_view({'post': 'post_feedback'}), name = 'post_feedback'),
 ]
\ No newline at end of file
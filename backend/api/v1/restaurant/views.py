@@ -1,3 +1,6 @@
+from backend.api.v1.viewsets.mixins import PublicReadMixin
+from backend.api.v1.viewsets.throttles import SCOPED_THROTTLE_CLASSES
+from backend.api.v1.viewsets.utils import etag_matches, make_etag
 from backend.restaurant.models import Address, Feedback, Media, Restaurant
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
@@ -7,7 +10,7 @@ from .serializers import (AddressSerializer, FeedBackSerializer,
                           RestaurantSerializer)
 
 
-class RestaurantReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):  
+class RestaurantReadOnlyViewSet(PublicReadMixin, viewsets.ReadOnlyModelViewSet):  
     """
     Restaurant API view for Client APP
     """  
@@ -16,11 +19,17 @@ class RestaurantReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def restaurant(self, request, *args, **kwargs):
         try:
-            restaurant = Restaurant.objects.get()
+            restaurant = Restaurant.objects.select_related("rating_summary").get()
             serializer = RestaurantSerializer(restaurant, many = False, context = {'request': request})
+            data = {'restaurant': serializer.data}
+            # ETAG -> 304 FOR CLIENT AND CACHED COMPRESSED BODY
+            etag = make_etag(data)
+            if etag_matches(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
             return Response(
-            {'restaurant': serializer.data},
-            status=status.HTTP_200_OK
+            data,
+            status=status.HTTP_200_OK,
+            headers={"ETag": etag}
         )
         except Restaurant.DoesNotExist:
             return Response(
@@ -29,7 +38,7 @@ class RestaurantReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
-class AddressReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+class AddressReadOnlyViewSet(PublicReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Addresses of Restaurant for Client APP
     """    
@@ -52,12 +61,14 @@ class FeedBackModelViewSetForClient(viewsets.ModelViewSet):
     queryset = Feedback.objects.all()
     serializer_class = FeedBackSerializer
     http_method_names = ['post']
+    throttle_classes = SCOPED_THROTTLE_CLASSES
+    throttle_scope = "feedback"
 
     @action(detail=False, methods=['post'])
     def post_feedback(self, request, *args, **kwargs):
         serializer = FeedBackSerializer(data=request.data, context = {'request': request})
         if not serializer.is_valid(raise_exception=True):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        serializer.save(customer = request.user)
+        serializer.save(customer_id = request.user.pk)
         return Response("Feedback submitted successfully", status=status.HTTP_201_CREATED)
         
\ No newline at end of file
@@ -0,0 +1,48 @@
+import django_filters
+from backend.product.search import search_product_ids
+from backend.restaurant.models import Feedback
+from django.db.models import Case, IntegerField, Q, When
+from rest_framework.filters import BaseFilterBackend
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+        ?search=... over product name, category name and ingredient names
+        with full text index (FTS5 / tsvector). Result is ranked, best first
+        (annotation "search_rank": 0, 1, 2 ...) and without duplicate rows.
+    """
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+
+        product_ids = search_product_ids(query)
+        if product_ids is None:
+            # DATABASE WITHOUT FULL TEXT INDEX
+            return queryset.filter(
+                Q(name__icontains = query) | Q(category__name__icontains = query) | Q(ingredients__name__icontains = query)
+            ).distinct()
+
+        rank = Case(
+            *[When(pk = pk, then = position) for position, pk in enumerate(product_ids)],
+            output_field = IntegerField()
+        )
+        return queryset.filter(pk__in = product_ids).annotate(search_rank = rank).order_by("search_rank")
+
+
+
+class ReviewFilter(django_filters.FilterSet):
+    """
+        ?rating_min=4&rating_max=5&created_after=2023-08-01&created_before=2023-09-01
+        (indexes: (rating, created_at) and (created_at))
+    """
+    rating_min = django_filters.NumberFilter(field_name = "rating", lookup_expr = "gte")
+    rating_max = django_filters.NumberFilter(field_name = "rating", lookup_expr = "lte")
+    created_after = django_filters.DateTimeFilter(field_name = "created_at", lookup_expr = "gte")
+    created_before = django_filters.DateTimeFilter(field_name = "created_at", lookup_expr = "lt")
+
+    class Meta:
+        model = Feedback
+        fields = ("rating",)
@@ -0,0 +1,263 @@
+import functools
+import gzip
+import hashlib
+
+from asgiref.sync import (async_to_sync, iscoroutinefunction,
+                          markcoroutinefunction, sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import get_max_age, patch_vary_headers
+from django.utils.module_loading import import_string
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+MIN_COMPRESS_LENGTH = 200
+# CACHED BODY IS COMPRESSED ONCE, SO IT CAN HAVE THE BEST (SLOW) LEVEL
+CACHED_BROTLI_QUALITY = 11
+CACHED_GZIP_LEVEL = 9
+BROTLI_QUALITY = 4
+# BREACH: RANDOM BYTES IN GZIP HEADER (SAME AS GZipMiddleware) FOR NOT PUBLIC RESPONSES
+MAX_RANDOM_BYTES = GZipMiddleware.max_random_bytes
+
+
+def get_accepted_encoding(request, allow_brotli=True):
+    """
+        "br" or "gzip" by Accept-Encoding header (q=0 means not accepted),
+        br only if brotli is installed and allowed. None if nothing.
+    """
+    accepted = set()
+    for item in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    if allow_brotli and brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(content, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(content, quality = CACHED_BROTLI_QUALITY if best else BROTLI_QUALITY)
+    if best:
+        return gzip.compress(content, compresslevel = CACHED_GZIP_LEVEL, mtime = 0)
+    return compress_string(content, max_random_bytes = MAX_RANDOM_BYTES)
+
+
+
+def is_public_response(response):
+    """
+        Same body for everybody (menu, categories ...): 200 with ETag and
+        not Cache-Control private / no-store. Only such bodies have no
+        secret for BREACH, so only they are brotli or cached.
+    """
+    if response.status_code != 200 or not response.has_header("ETag"):
+        return False
+    cache_control = response.get("Cache-Control", "").lower()
+    return "private" not in cache_control and "no-store" not in cache_control and get_max_age(response) != 0
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality = BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+
+class CompressionMiddleware:
+    """
+        gzip / brotli of responses by Accept-Encoding (like GZipMiddleware,
+        but also br). Public response (is_public_response, it is reused):
+        compressed bytes are cached by (encoding, hash of body), so the same
+        menu is compressed only one time, not on every request. Hashing is
+        much cheaper than compressing, and the key never gets old, it just
+        expires.
+        Everything else (tokens, login, profile, admin) can have a secret
+        next to text from the request (BREACH), so only gzip with random
+        bytes, like GZipMiddleware, and never cached.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+
+    def process_response(self, request, response):
+        content_type = response.get("Content-Type", "")
+        if response.has_header("Content-Encoding") or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        # ONE URL, DIFFERENT BODIES BY Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        public = is_public_response(response)
+        encoding = get_accepted_encoding(request, allow_brotli = public)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == "br":
+                response.streaming_content = brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, max_random_bytes = MAX_RANDOM_BYTES)
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < MIN_COMPRESS_LENGTH:
+                return response
+            if public:
+                compressed = self.get_compressed(response, encoding)
+            else:
+                compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # BODY IS NOT THE SAME BYTES ANYMORE -> WEAK ETAG (SAME AS GZipMiddleware)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+    def get_compressed(self, response, encoding):
+        # KEY IS HASH OF RENDERED BYTES, ETAG CAN BE THE SAME FOR OTHER BYTES (fields=, renderer)
+        key = f"compressed:{encoding}:{hashlib.blake2b(response.content, digest_size=16).hexdigest()}"
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(response.content, encoding, best = True)
+            cache.set(key, compressed, timeout = settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed
+
+
+
+# MIDDLEWARE BELOW PublicFastPathMiddleware WHICH FAST PATH STILL RUNS:
+# ALLOWED_HOSTS, DISALLOWED_USER_AGENTS, Content-Length, X-Frame-Options
+FAST_PATH_MIDDLEWARE = (
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+)
+
+
+@functools.lru_cache(maxsize=512)
+def get_public_match(path, urlconf):
+    """
+        ResolverMatch of path if its view has PublicReadMixin, else None.
+        Keyed by urlconf too (request.urlconf, override of ROOT_URLCONF).
+    """
+    try:
+        match = resolve(path, urlconf)
+    except Resolver404:
+        return None
+    # DRF VIEW -> ITS CLASS, ASYNC VIEW -> FUNCTION ITSELF (public_view)
+    view = getattr(match.func, "cls", match.func)
+    return match if getattr(view, "public_fast_path", False) else None
+
+
+
+class PublicFastPathMiddleware:
+    """
+        GET/HEAD of public views (PublicReadMixin) are answered here, rest
+        of MIDDLEWARE (session, csrf, debug toolbar, auth, messages) is
+        skipped for them, only FAST_PATH_MIDDLEWARE (common, clickjacking)
+        is run, so response has the same headers as by normal path.
+        Middleware above this one (security, whitenoise, compression, cors)
+        works as usual.
+        Under ASGI async views (ASYNC_CLIENT_VIEWS) are awaited here, sync
+        ones are run in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # IN ORDER OF MIDDLEWARE, THEY ONLY LOOK AT REQUEST / HEADERS (NO IO)
+        self.fast_path_middleware = [
+            import_string(path)(get_response) for path in settings.MIDDLEWARE if path in FAST_PATH_MIDDLEWARE
+        ]
+
+
+    def get_match(self, request):
+        if not settings.PUBLIC_FAST_PATH or request.method not in ("GET", "HEAD"):
+            return None
+        match = get_public_match(request.path_info, getattr(request, "urlconf", None) or settings.ROOT_URLCONF)
+        if match is not None:
+            request.resolver_match = match
+        return match
+
+
+    def process_request(self, request):
+        for middleware in self.fast_path_middleware:
+            response = getattr(middleware, "process_request", lambda request: None)(request)
+            if response is not None:
+                return response
+        return None
+
+
+    def process_response(self, request, response):
+        if hasattr(response, "render") and callable(response.render):
+            response = response.render()
+        for middleware in reversed(self.fast_path_middleware):
+            response = middleware.process_response(request, response)
+        return response
+
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = self.get_match(request)
+        if match is None:
+            return self.get_response(request)
+
+        response = self.process_request(request)
+        if response is None:
+            view = match.func
+            if iscoroutinefunction(view):
+                view = async_to_sync(view)
+            response = view(request, *match.args, **match.kwargs)
+        return self.process_response(request, response)
+
+
+    async def __acall__(self, request):
+        match = self.get_match(request)
+        if match is None:
+            return await self.get_response(request)
+
+        response = self.process_request(request)
+        if response is None:
+            if iscoroutinefunction(match.func):
+                response = await match.func(request, *match.args, **match.kwargs)
+            else:
+                response = await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response = await sync_to_async(response.render)()
+        return self.process_response(request, response)
@@ -0,0 +1,122 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from .utils import streaming_response
+
+
+class PublicReadMixin:
+    """
+        Public GET endpoint (menu, categories, restaurant ...): no
+        authentication classes, so stray "Authorization: Basic" header does
+        not hash a password, and PublicFastPathMiddleware calls the view
+        without session, csrf, auth and debug toolbar middleware.
+        PUBLIC_FAST_PATH = False -> default authentication as before.
+    """
+    public_fast_path = True
+
+    def get_authenticators(self):
+        if not settings.PUBLIC_FAST_PATH:
+            return super().get_authenticators()
+        return []
+
+
+
+class SparseFieldsetMixin:
+    """
+        ?fields=name,slug,original_price for GET requests.
+        Serializer gives only these fields and queryset loads only their
+        columns with .only(). Prefetch is skipped if no prefetched field
+        is asked.
+
+        sparse_field_sources: serializer field -> model fields it needs,
+        if field is not there its name is used.
+    """
+    fields_query_param = "fields"
+    sparse_field_sources = {}
+    sparse_prefetch_fields = ()
+
+    def get_sparse_fields(self):
+        if self.request is None or self.request.method not in ("GET", "HEAD"):
+            return None
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+
+        fields = [field.strip() for field in value.split(",") if field.strip()]
+        allowed = self.get_serializer_class().Meta.fields
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValidationError({self.fields_query_param: f"Unknown fields: {', '.join(unknown)}"})
+        return fields
+
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        columns = []
+        for field in fields:
+            columns.extend(self.sparse_field_sources.get(field, (field,)))
+        # CURSOR PAGINATION READS ORDERING FIELDS OF THE LAST ROW, LOAD THEM TOO
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        columns.extend(field.lstrip("-") for field in ordering if field.lstrip("-") in model_fields)
+
+        if not any("__" in column for column in columns):
+            # NO RELATED FIELD ASKED -> NO JOIN
+            queryset = queryset.select_related(None)
+        if not any(field in self.sparse_prefetch_fields for field in fields):
+            queryset = queryset.prefetch_related(None)
+        return queryset.only(*columns)
+
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+
+class StreamingListMixin:
+    """
+        ?stream=1 for list: whole (filtered) list without pagination as
+        json array, built by chunks of STREAM_CHUNK_SIZE rows straight
+        from queryset.iterator(). So memory is the same for 100 or 50k rows.
+    """
+    stream_query_param = "stream"
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) not in ("1", "true"):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            # SAME ORDER AS PAGES OF CURSOR PAGINATION
+            queryset = queryset.order_by(*self.paginator.get_ordering(request, queryset, self))
+        return streaming_response(request, self.stream_list(queryset), content_type="application/json")
+
+
+    def stream_list(self, queryset):
+        # SAME OUTPUT AS JSONRenderer: COMPACT, NOT ASCII
+        encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        chunk_size = settings.STREAM_CHUNK_SIZE
+        yield "["
+        separator = ""
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                yield separator + self.encode_chunk(chunk, encoder)
+                separator = ","
+                chunk = []
+        if chunk:
+            yield separator + self.encode_chunk(chunk, encoder)
+        yield "]"
+
+
+    def encode_chunk(self, chunk, encoder):
+        data = self.get_serializer(chunk, many=True).data
+        return ",".join(encoder.encode(item) for item in data)
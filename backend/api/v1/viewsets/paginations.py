@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+        Keyset pagination for products ordered by (created_at, id).
+        There is no COUNT(*) and no OFFSET, the next page continues
+        WHERE created_at > last one, so page N costs same as page 1.
+
+        Misali:
+            /menu/?page_size=20 -> {"next": ".../menu/?cursor=cD0y...", "previous": null, "results": [...]}
+    """
+    ordering = ("created_at", "id")
+    page_size = settings.PRODUCT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.PRODUCT_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        # SEARCH RESULTS ARE PAGED IN ORDER OF RANK
+        if "search_rank" in queryset.query.annotations:
+            return ("search_rank", "id")
+        return super().get_ordering(request, queryset, view)
+
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+        Keyset pagination for reviews, newest first (created_at, id),
+        page N costs same as page 1 (index on created_at).
+    """
+    ordering = ("-created_at", "-id")
+    page_size = settings.REVIEW_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.REVIEW_MAX_PAGE_SIZE
@@ -1,10 +1,108 @@
+from backend.product.images import get_image_state, get_variant_name
+from backend.product.resize import get_resized_image_urls
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
 from rest_framework import serializers
 
 
+def get_image_url(name, request=None):
+    """
+        Same as serializers.ImageField: absolute url if request is given
+    """
+    if not name:
+        return None
+    url = default_storage.url(str(name))
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+
+def get_image_variant_urls(name, request=None):
+    """
+        {"thumb": url, "card": url, "full": url, "sizes": {"640x480": signed url, ...}}
+        of image, for srcset. Variant which is not made yet (by worker) gives
+        url of original. sizes are resized on demand (IMAGE_RESIZE_SIZES).
+    """
+    if not name:
+        return None
+    name = str(name)
+    state = get_image_state(name)
+    original = get_image_url(name, request)
+    urls = {
+        variant: get_image_url(get_variant_name(name, variant), request) if variant in state.variants else original
+        for variant in settings.IMAGE_VARIANTS
+    }
+    urls["sizes"] = get_resized_image_urls(name, request)
+    return urls
+
+
 class RecursiveSerializer(serializers.Serializer):
     """
         For Category Childreen
     """
     def to_representation(self, instance):
         serializer = self.parent.parent.__class__(instance, context = self.context)
-        return serializer.data
\ No newline at end of file
+        return serializer.data
+
+
+class SparseFieldsSerializerMixin:
+    """
+        Serializer(..., fields=["name", "slug"]) -> gives only these fields
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+        image_variants = ImageVariantsField(source="image")
+    """
+    def to_representation(self, image):
+        return get_image_variant_urls(image.name if image else None, self.context.get("request"))
+
+
+
+
+class FastReadOnlySerializer(serializers.BaseSerializer):
+    """
+        Base of fast read only serializers. Rows are built as plain dicts
+        straight from values() (queryset) or from model objects (list, for
+        example a page), without DRF field machinery for every row.
+
+        Subclass gives Meta.fields and from_values(queryset, fields) /
+        from_object(obj, fields). Also works with many=True and fields=[...]
+        like the other serializers.
+    """
+    def __new__(cls, *args, **kwargs):
+        # NO ListSerializer, THE WHOLE LIST IS BUILT HERE
+        return serializers.Field.__new__(cls, *args, **kwargs)
+
+
+    def __init__(self, instance=None, **kwargs):
+        self.many = kwargs.pop("many", False)
+        fields = kwargs.pop("fields", None)
+        self.output_fields = [field for field in self.Meta.fields if fields is None or field in fields]
+        super().__init__(instance, **kwargs)
+
+
+    def to_representation(self, instance):
+        if not self.many:
+            return self.from_object(instance, self.output_fields)
+        if isinstance(instance, QuerySet):
+            return self.from_values(instance, self.output_fields)
+        return [self.from_object(obj, self.output_fields) for obj in instance]
+
+
+    def get_image_url(self, name):
+        return get_image_url(name, self.context.get("request"))
+
+
+    def get_image_variant_urls(self, name):
+        return get_image_variant_urls(name, self.context.get("request"))
@@ -0,0 +1,84 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+        Token bucket by view.throttle_scope, rate "N/period" from
+        DEFAULT_THROTTLE_RATES: bucket of N tokens, refilled N per period,
+        one token per request. So a burst of N is allowed, then one request
+        every period/N. One cache get & set per request (not a list of
+        times like SimpleRateThrottle). Rate is not set -> not throttled.
+        429 response has Retry-After (seconds till next token).
+
+        Get & set of bucket is atomic only inside one process (_bucket_lock).
+        With shared THROTTLE_CACHE_URL requests of different workers at the
+        same moment can read the same bucket, so a burst can get a few
+        (up to number of workers) requests more than N.
+    """
+    cache = caches[settings.THROTTLE_CACHE]
+    rate_suffix = ""
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        # SCOPE IS KNOWN ONLY WITH VIEW
+        pass
+
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope or f"{self.scope}{self.rate_suffix}" not in self.THROTTLE_RATES:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.THROTTLE_RATES[f"{self.scope}{self.rate_suffix}"])
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        refill = self.num_requests / self.duration
+        now = self.timer()
+        with _bucket_lock:
+            tokens, updated_at = self.cache.get(self.key, (self.num_requests, now))
+            tokens = min(self.num_requests, tokens + (now - updated_at) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # FULL BUCKET AFTER duration, KEY IS NOT NEEDED LONGER
+            self.cache.set(self.key, (tokens, now), self.duration)
+        self.wait_seconds = 0 if allowed else (1 - tokens) / refill
+        return allowed
+
+
+    def wait(self):
+        return self.wait_seconds
+
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+        Bucket per client IP, rate DEFAULT_THROTTLE_RATES[scope]
+    """
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+        Bucket per authenticated user, rate DEFAULT_THROTTLE_RATES[scope + "_user"]
+    """
+    rate_suffix = "_user"
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {"scope": f"{self.scope}_user", "ident": request.user.pk}
+
+
+
+# PER IP AND PER USER, FOR EXPENSIVE ENDPOINTS (PASSWORD HASH, WRITES)
+SCOPED_THROTTLE_CLASSES = [IPTokenBucketThrottle, UserTokenBucketThrottle]
@@ -1,4 +1,13 @@
-from django.core.files.storage import default_storage
+import hashlib
+
+from asgiref.sync import sync_to_async
+from backend.product.images import get_image_file_names
+from backend.tasks.media import delete_media_files
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
 
 
 def remove_image(image):
@@ -7,5 +16,74 @@ def remove_image(image):
         and if object will be deleted which is has image
         so remove from media
     """
-    if default_storage.exists(image.path):
-        default_storage.delete(image.path)
\ No newline at end of file
+    # BY WORKER AFTER COMMIT, WITH VARIANTS OF IMAGE
+    delete_media_files.enqueue(get_image_file_names(image.name))
+
+
+
+def make_etag(data):
+    """
+        ETag from the rendered json of data, same data -> same etag
+        in every worker.
+    """
+    content = JSONRenderer().render(data)
+    return quote_etag(hashlib.md5(content).hexdigest())
+
+
+
+def etag_matches(request, etag):
+    """
+        True if client already has this version (If-None-Match header).
+        Weak comparison, compressed responses give W/"..." etag.
+    """
+    etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return "*" in etags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in etags}
+
+
+
+def json_etag_response(request, data, etag=None, status=200):
+    """
+        For views without DRF (async views): same json bytes as DRF Response,
+        304 if client has this etag. etag = None -> no ETag (errors).
+    """
+    if etag is None:
+        return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status)
+    if etag_matches(request, etag):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status, headers={"ETag": etag})
+
+
+
+def public_view(view):
+    """
+        Async view without authentication, PublicFastPathMiddleware calls it
+        directly (same as PublicReadMixin for DRF views).
+    """
+    view.public_fast_path = True
+    return view
+
+
+
+def streaming_response(request, iterator, **kwargs):
+    """
+        StreamingHttpResponse which streams with WSGI and with ASGI. Django
+        reads a sync iterator under ASGI with sync_to_async(list), so whole
+        body would be in memory before the first byte -> async iterator,
+        every chunk is made in the sync thread of the request (same db
+        connection) and sent at once.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        iterator = iterate_in_thread(iterator)
+    return StreamingHttpResponse(iterator, **kwargs)
+
+
+
+async def iterate_in_thread(iterator):
+    iterator = iter(iterator)
+    get_next = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while True:
+        chunk = await get_next(iterator, done)
+        if chunk is done:
+            return
+        yield chunk
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProductConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.product"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .images import connect_image_variants
+        from .search import create_search_index
+
+        post_migrate.connect(create_search_index, sender=self)
+        connect_image_variants()
@@ -0,0 +1,54 @@
+import hashlib
+import time
+
+from .models import MenuVersion
+
+MENU_VERSION_ID = 1
+
+
+def get_menu_version():
+    """
+        Global version of the menu. Every change of product, category
+        or ingredients gives a new version so old cache entries are
+        never read again and just expire.
+        Kept in database (one primary key query), so a change saved by
+        another worker or by a management command is seen at once.
+    """
+    version = MenuVersion.objects.filter(pk = MENU_VERSION_ID).values_list("version", flat = True).first()
+    if version is None:
+        version = MenuVersion.objects.get_or_create(pk = MENU_VERSION_ID, defaults = {"version": time.time_ns()})[0].version
+    return version
+
+
+def bump_menu_version():
+    """
+        New version is a timestamp (not incr) so a new row never starts
+        again from an old number.
+    """
+    version = time.time_ns()
+    if not MenuVersion.objects.filter(pk = MENU_VERSION_ID).update(version = version):
+        MenuVersion.objects.update_or_create(pk = MENU_VERSION_ID, defaults = {"version": version})
+
+
+def make_menu_cache_key(version, parts):
+    raw = ":".join("" if part is None else str(part) for part in parts)
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"menu:{version}:{digest}"
+
+
+def get_menu_cache_key(*parts):
+    """
+        Misali:
+            get_menu_cache_key("menu", "pizza") -> menu:1690000000:5f2b...
+    """
+    return make_menu_cache_key(get_menu_version(), parts)
+
+
+async def aget_menu_cache_key(*parts):
+    """
+        Same key as get_menu_cache_key, for async views
+    """
+    version = await MenuVersion.objects.filter(pk = MENU_VERSION_ID).values_list("version", flat = True).afirst()
+    if version is None:
+        version = (await MenuVersion.objects.aget_or_create(pk = MENU_VERSION_ID, defaults = {"version": time.time_ns()}))[0].version
+    return make_menu_cache_key(version, parts)
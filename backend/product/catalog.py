@@ -0,0 +1,231 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Category, Ingredient, Product
+from .utils import get_slugify
+from .validators import (validate_discount_percent_maximum,
+                         validate_discount_percent_of_positive,
+                         validate_max_digits, validate_positive)
+
+CATALOG_FORMATS = ("csv", "jsonl")
+CATALOG_FIELDS = (
+    "category", "name", "description", "original_price", "discount_percent",
+    "quantity", "image", "is_active", "ingredients",
+)
+# CSV HAS NO LIST, INGREDIENTS ARE JOINED: "cheese|tomato"
+INGREDIENTS_SEPARATOR = "|"
+DEFAULT_PRODUCT_IMAGE = Product._meta.get_field("image").default
+# Category HAS NO DEFAULT IMAGE, NEW CATEGORIES GET THE SAME PLACEHOLDER
+DEFAULT_CATEGORY_IMAGE = DEFAULT_PRODUCT_IMAGE
+# ONLY FOR NEW PRODUCTS, EXISTING ONES KEEP VALUES OF COLUMNS NOT GIVEN IN ROW
+CATALOG_DEFAULTS = {
+    "discount_percent": None,
+    "quantity": 1,
+    "image": DEFAULT_PRODUCT_IMAGE,
+    "is_active": True,
+}
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    """
+        One product row of the catalog file. Category and ingredients
+        are given by name and created if they are missing. Optional
+        columns which are not given are not in validated_data.
+    """
+    category = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    original_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, validators=[validate_positive, validate_max_digits]
+    )
+    discount_percent = serializers.DecimalField(
+        max_digits=4, decimal_places=2, required=False, allow_null=True,
+        validators=[validate_discount_percent_of_positive, validate_discount_percent_maximum]
+    )
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    image = serializers.CharField(max_length=100, required=False)
+    is_active = serializers.BooleanField(required=False)
+    ingredients = serializers.ListField(child=serializers.CharField(max_length=150), required=False)
+
+
+
+# EXPORT
+def export_catalog(file_format="jsonl"):
+    """
+        Generator of text lines (with header for csv), products are read
+        by chunks so memory doesn't grow with catalog size.
+    """
+    products = Product.objects.select_related("category").prefetch_related(
+        Prefetch("ingredients", queryset=Ingredient.objects.only("name"))
+    ).order_by("id")
+
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CATALOG_FIELDS)
+
+    for product in products.iterator(chunk_size = settings.CATALOG_CHUNK_SIZE):
+        row = {
+            "category": product.category.name,
+            "name": product.name,
+            "description": product.description,
+            "original_price": str(product.original_price),
+            "discount_percent": None if product.discount_percent is None else str(product.discount_percent),
+            "quantity": product.quantity,
+            "image": product.image.name if product.image else None,
+            "is_active": product.is_active,
+            "ingredients": [ingredient.name for ingredient in product.ingredients.all()],
+        }
+        if file_format == "csv":
+            row["ingredients"] = INGREDIENTS_SEPARATOR.join(row["ingredients"])
+            writer.writerow(["" if row[field] is None else row[field] for field in CATALOG_FIELDS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    if file_format == "csv" and buffer.getvalue():
+        yield buffer.getvalue()
+# END EXPORT
+
+
+# IMPORT
+def read_catalog_rows(lines, file_format="jsonl"):
+    """
+        (line number, row dict) from text lines, broken line -> row is an error string
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            number = reader.line_num
+            # EMPTY CELL MEANS NOT GIVEN
+            row = {field: value for field, value in row.items() if field and value not in ("", None)}
+            if "ingredients" in row:
+                row["ingredients"] = [name.strip() for name in row["ingredients"].split(INGREDIENTS_SEPARATOR) if name.strip()]
+            yield number, row
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f"Invalid json: {exc}"
+            continue
+        yield number, row if isinstance(row, dict) else "Row must be a json object."
+
+
+
+def import_catalog(lines, file_format="jsonl"):
+    """
+        Create or update (by name) products from catalog lines with bulk queries,
+        CATALOG_CHUNK_SIZE rows in one transaction.
+        return report: {"created": 10, "updated": 2, "errors": [{"line": 5, "errors": {...}}]}
+    """
+    from .signals import ALL, schedule_menu_rebuild
+
+    report = {"created": 0, "updated": 0, "errors": []}
+    chunk = []
+    for number, row in read_catalog_rows(lines, file_format):
+        serializer = CatalogRowSerializer(data = row) if isinstance(row, dict) else None
+        if serializer is None or not serializer.is_valid():
+            report["errors"].append({"line": number, "errors": row if serializer is None else serializer.errors})
+            continue
+        chunk.append((number, serializer.validated_data))
+        if len(chunk) >= settings.CATALOG_CHUNK_SIZE:
+            save_catalog_chunk(chunk, report)
+            chunk = []
+    if chunk:
+        save_catalog_chunk(chunk, report)
+    # ERRORS OF SAVED CHUNKS ARE ADDED LATER THAN ERRORS OF VALIDATION
+    report["errors"].sort(key = lambda error: error["line"])
+
+    # BULK QUERIES DON'T SEND SIGNALS, MENU SNAPSHOT, SEARCH & CACHE ARE REBUILT ONCE
+    if report["created"] or report["updated"]:
+        schedule_menu_rebuild(categories = ALL, products = ALL)
+    return report
+
+
+
+@transaction.atomic
+def save_catalog_chunk(rows, report):
+    """
+        rows: [(line number, validated row)]
+    """
+    # SAME NAME TWICE IN ONE CHUNK -> LAST ROW WINS
+    rows = list({row["name"]: (number, row) for number, row in rows}.values())
+
+    categories = {category.name: category for category in Category.objects.filter(
+        name__in = {row["category"].capitalize() for number, row in rows}
+    )}
+    missing = {row["category"].capitalize() for number, row in rows} - set(categories)
+    if missing:
+        Category.objects.bulk_create(
+            [Category(name = name, slug = get_slugify(name), image = DEFAULT_CATEGORY_IMAGE) for name in missing],
+            ignore_conflicts = True
+        )
+        categories.update({category.name: category for category in Category.objects.filter(name__in = missing)})
+    # NOT CREATED: OTHER CATEGORY HAS THE SAME SLUG -> ERROR OF ROW, NOT 500
+    for number, row in rows:
+        if row["category"].capitalize() not in categories:
+            report["errors"].append({"line": number, "errors": {
+                "category": [f"Other category has the same slug: {get_slugify(row['category'])}."]
+            }})
+    rows = [row for number, row in rows if row["category"].capitalize() in categories]
+
+    existing = {product.name: product for product in Product.objects.filter(name__in = [row["name"] for row in rows])}
+    to_create, to_update = [], []
+    now = timezone.now()
+    for row in rows:
+        product = existing.get(row["name"])
+        if product is None:
+            product = Product(name = row["name"])
+            row = {**CATALOG_DEFAULTS, **row}
+        else:
+            # bulk_update DOES NOT SET auto_now, /menu/changes/ READS updated_at
+            product.updated_at = now
+        product.category = categories[row["category"].capitalize()]
+        for field in ("description", "original_price", "discount_percent", "quantity", "image", "is_active"):
+            if field in row:
+                setattr(product, field, row[field])
+        product.set_computed_fields()
+        (to_update if product.pk else to_create).append(product)
+
+    Product.objects.bulk_create(to_create)
+    Product.objects.bulk_update(to_update, [
+        "category", "slug", "description", "original_price", "discount_percent",
+        "discounted_price", "quantity", "image", "is_active", "updated_at",
+    ])
+    # sqlite/postgres GIVE PKS FROM bulk_create, OTHERS ARE RELOADED BY NAME
+    if any(product.pk is None for product in to_create):
+        created = dict(Product.objects.filter(name__in = [product.name for product in to_create]).values_list("name", "pk"))
+        for product in to_create:
+            product.pk = created[product.name]
+
+    # INGREDIENTS ARE REPLACED ONLY FOR ROWS WHICH GIVE THEM
+    rows = [row for row in rows if "ingredients" in row]
+    ingredients = {
+        ingredient.name: ingredient
+        for ingredient in Ingredient.objects.resolve(name for row in rows for name in row["ingredients"])
+    }
+    products = {product.name: product for product in to_create + to_update}
+    through = Product.ingredients.through
+    through.objects.filter(product_id__in = [products[row["name"]].pk for row in rows if row["name"] in existing]).delete()
+    through.objects.bulk_create([
+        through(product_id = products[row["name"]].pk, ingredient_id = ingredients[name.lower()].pk)
+        for row in rows
+        for name in dict.fromkeys(name.lower() for name in row["ingredients"])
+    ])
+
+    report["created"] += len(to_create)
+    report["updated"] += len(to_update)
+# END IMPORT
@@ -0,0 +1,180 @@
+import io
+import os
+import posixpath
+import threading
+import time
+
+from backend.tasks.queue import task
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save, pre_save
+from PIL import Image, ImageOps
+
+# MODEL -> IMAGE FIELD, VARIANTS ARE MADE FOR THESE IMAGES
+IMAGE_VARIANT_FIELDS = {
+    "product.Category": "image",
+    "product.Product": "image",
+    "restaurant.Media": "image",
+    "account.UserBase": "avatar",
+}
+
+# NAME -> (EXPIRES AT, ImageState), SEE get_image_state
+_image_states = {}
+IMAGE_STATES_MAX_SIZE = 10000
+
+
+def get_variant_name(name, variant):
+    """
+        Path of variant is made from path of original, so urls are known
+        without any query.
+        Misali:
+            product_images/lavash.jpg, "thumb" -> product_images/variants/lavash.thumb.webp
+    """
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "variants", f"{stem}.{variant}.webp")
+
+
+
+class ImageState:
+    """
+        What is on disk for an image: version (mtime_ns of original, None if
+        there is no file) and names of variants which are already made.
+    """
+    __slots__ = ("version", "variants")
+
+    def __init__(self, version, variants):
+        self.version = version
+        self.variants = variants
+
+
+
+def get_image_state(name):
+    """
+        ImageState of image, kept in memory IMAGE_STATE_TIMEOUT seconds, so
+        serializers do not stat files for every row of every response.
+        Variants made later are seen after the timeout (or at once in the
+        process which made them).
+    """
+    now = time.monotonic()
+    cached = _image_states.get(name)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    try:
+        version = str(os.stat(default_storage.path(name)).st_mtime_ns)
+    except (OSError, ValueError):
+        version = None
+    variants = frozenset(
+        variant for variant in settings.IMAGE_VARIANTS
+        if version is not None and os.path.exists(default_storage.path(get_variant_name(name, variant)))
+    )
+    state = ImageState(version, variants)
+    if len(_image_states) >= IMAGE_STATES_MAX_SIZE:
+        _image_states.clear()
+    _image_states[name] = (now + settings.IMAGE_STATE_TIMEOUT, state)
+    return state
+
+
+
+def forget_image_state(name):
+    _image_states.pop(name, None)
+
+
+
+def get_image_file_names(name):
+    """
+        Original and all variants, for removing from media
+    """
+    return [name] + [get_variant_name(name, variant) for variant in settings.IMAGE_VARIANTS]
+
+
+
+def write_variant(name, content):
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    # SAME NAME (NOT name_abc123.webp) AND WHOLE FILE APPEARS AT ONCE
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+
+@task
+def make_image_variants(name, force=False):
+    """
+        Makes every IMAGE_VARIANTS size of the image as WEBP (never bigger
+        than original), existing ones are skipped if not force.
+        return names of made variants
+    """
+    if not name or not default_storage.exists(name):
+        return []
+    missing = [
+        variant for variant in settings.IMAGE_VARIANTS
+        if force or not default_storage.exists(get_variant_name(name, variant))
+    ]
+    if not missing:
+        return []
+
+    with default_storage.open(name, "rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    made = []
+    for variant in missing:
+        width, height, quality = settings.IMAGE_VARIANTS[variant]
+        resized = image.copy()
+        resized.thumbnail((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, "WEBP", quality = quality, method = 4)
+        variant_name = get_variant_name(name, variant)
+        write_variant(variant_name, buffer.getvalue())
+        made.append(variant_name)
+    forget_image_state(name)
+    menu_image_changed(name)
+    return made
+
+
+
+def menu_image_changed(name):
+    """
+        Variant urls are in the menu snapshot and cache only when the files
+        exist, so menu of products/categories with this image is rebuilt.
+    """
+    from .models import Category, Product
+    from .signals import schedule_menu_rebuild
+
+    categories = set(Product.objects.filter(image = name).values_list("category_id", flat = True))
+    categories.update(Category.objects.filter(image = name).values_list("id", flat = True))
+    if categories:
+        schedule_menu_rebuild(categories = categories)
+
+
+
+def image_uploading(sender, instance, **kwargs):
+    """
+        Uploaded file is not committed yet (it is saved to storage in this
+        save), other saves (price, name, image given as name ...) are skipped.
+    """
+    image = getattr(instance, IMAGE_VARIANT_FIELDS[sender._meta.label])
+    instance._image_uploaded = bool(image) and not image._committed
+
+
+
+def image_saved(sender, instance, **kwargs):
+    """
+        New image has no variants yet -> task for the worker
+    """
+    if getattr(instance, "_image_uploaded", False):
+        instance._image_uploaded = False
+        make_image_variants.enqueue(getattr(instance, IMAGE_VARIANT_FIELDS[sender._meta.label]).name)
+
+
+
+def connect_image_variants():
+    for label in IMAGE_VARIANT_FIELDS:
+        model = apps.get_model(label)
+        pre_save.connect(image_uploading, sender = model, dispatch_uid = f"image_variants:{label}")
+        post_save.connect(image_saved, sender = model, dispatch_uid = f"image_variants:{label}")
@@ -0,0 +1,145 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+CLIENT_URLS = (
+    "/api/v1/food/categories/",
+    "/api/v1/food/menu/",
+    "/api/v1/restaurant/",
+    "/api/v1/restaurant/addresses/",
+)
+
+# MODE -> (gunicorn arguments, ASYNC_CLIENT_VIEWS)
+SERVER_MODES = {
+    "sync": (["config.wsgi:application"], "False"),
+    "async": (["config.asgi:application", "-k", "uvicorn.workers.UvicornWorker"], "True"),
+}
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+
+def get_rss_bytes(pid):
+    """
+        RSS of process and its children (gunicorn master + workers), linux only
+    """
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pids.extend(int(child) for child in children.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with sync workers (WSGI) and with uvicorn workers (ASGI, ASYNC_CLIENT_VIEWS) "
+        "on this database and compare req/s, latency and memory of client read endpoints "
+        "under the same number of concurrent connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default="sync,async", help="comma separated: sync, async")
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for both modes")
+        parser.add_argument("--concurrency", type=int, default=100, help="concurrent keep-alive connections")
+        parser.add_argument("--requests", type=int, default=4000, help="requests per mode")
+
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = [mode for mode in modes if mode not in SERVER_MODES]
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(unknown)}")
+
+        self.stdout.write(f"{'mode':<6} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>7} {'rss':>9}")
+        for mode in modes:
+            port = get_free_port()
+            server = self.start_server(mode, port, options["workers"])
+            try:
+                self.wait_for_server(port)
+                self.run_load(port, min(options["concurrency"], 20), 200)  # WARM UP CACHES
+                result = self.run_load(port, options["concurrency"], options["requests"])
+                rss = get_rss_bytes(server.pid)
+            finally:
+                server.terminate()
+                server.wait(timeout = 30)
+            elapsed, latencies, errors = result
+            latencies.sort()
+            self.stdout.write(
+                f"{mode:<6} {len(latencies) / elapsed:>8.0f} {latencies[len(latencies) // 2] * 1000:>7.1f}ms "
+                f"{latencies[int(len(latencies) * 0.99)] * 1000:>7.1f}ms {errors:>7} {rss / 1024 / 1024:>7.0f}MB"
+            )
+
+
+    def start_server(self, mode, port, workers):
+        arguments, async_views = SERVER_MODES[mode]
+        environment = {**os.environ, "ASYNC_CLIENT_VIEWS": async_views, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        return subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", *arguments, "-w", str(workers), "-b", f"127.0.0.1:{port}", "--log-level", "warning"],
+            cwd = settings.BASE_DIR,
+            env = environment,
+        )
+
+
+    def wait_for_server(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout = 1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("Server did not start.")
+
+
+    def run_load(self, port, concurrency, total):
+        """
+            concurrency threads, each with its own keep-alive connection,
+            request the client urls in turn. return (seconds, latencies, errors)
+        """
+        per_connection = [total // concurrency + (1 if number < total % concurrency else 0) for number in range(concurrency)]
+
+        def connection_worker(count):
+            latencies, errors = [], 0
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout = 60)
+            for number in range(count):
+                start = time.perf_counter()
+                try:
+                    connection.request("GET", CLIENT_URLS[number % len(CLIENT_URLS)], headers = {"Host": "localhost"})
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status >= 500:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout = 60)
+                latencies.append(time.perf_counter() - start)
+            connection.close()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers = concurrency) as executor:
+            results = list(executor.map(connection_worker, per_connection))
+        elapsed = time.perf_counter() - start
+        return elapsed, [latency for latencies, _ in results for latency in latencies], sum(errors for _, errors in results)
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# PROFILE -> PRAGMAS, "default" IS SQLITE AS DJANGO OPENS IT WITHOUT SQLITE_PRAGMAS
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": settings.SQLITE_PRAGMAS,
+}
+
+
+def connect(path, pragmas):
+    """
+        Same as django sqlite backend: autocommit (isolation_level=None),
+        python default timeout, then pragmas of profile.
+    """
+    connection = sqlite3.connect(path, isolation_level = None, check_same_thread = False)
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+    return connection
+
+
+
+def writer(path, pragmas, seconds, results):
+    """
+        Like a request saving one order row in transaction.atomic()
+    """
+    connection = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            connection.execute("BEGIN")
+            connection.execute("INSERT INTO bench_row (name, created_at) VALUES (?, ?)", ("order", time.time()))
+            connection.execute("COMMIT")
+            done += 1
+        except sqlite3.OperationalError:
+            # database is locked
+            errors += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+    connection.close()
+    results.put((done, errors))
+
+
+
+def reader(path, pragmas, seconds, results):
+    """
+        Like menu/list requests reading at the same time
+    """
+    connection = connect(path, pragmas)
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            connection.execute("SELECT count(*), max(created_at) FROM bench_row").fetchone()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    results.put((done, errors))
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent write throughput of sqlite with default settings and with SQLITE_PRAGMAS "
+        "(WAL, synchronous=NORMAL, busy_timeout ...). Writer and reader processes work on a "
+        "temporary database file at the same time, the project database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4, help="writing processes")
+        parser.add_argument("--readers", type=int, default=4, help="reading processes")
+        parser.add_argument("--seconds", type=float, default=5, help="duration per profile")
+
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'profile':<8} {'writes/s':>9} {'write errors':>13} {'reads/s':>9} {'read errors':>12}")
+        for profile, pragmas in SQLITE_PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "bench.sqlite3")
+                connection = connect(path, pragmas)
+                connection.execute("CREATE TABLE bench_row (id INTEGER PRIMARY KEY, name TEXT, created_at REAL)")
+                connection.close()
+
+                writes, write_errors, reads, read_errors = self.run(path, pragmas, options)
+            seconds = options["seconds"]
+            self.stdout.write(
+                f"{profile:<8} {writes / seconds:>9.0f} {write_errors:>13} {reads / seconds:>9.0f} {read_errors:>12}"
+            )
+
+
+    def run(self, path, pragmas, options):
+        results = {"writer": multiprocessing.Queue(), "reader": multiprocessing.Queue()}
+        processes = [
+            multiprocessing.Process(target = target, args = (path, pragmas, options["seconds"], results[kind]))
+            for kind, target, count in (("writer", writer, options["writers"]), ("reader", reader, options["readers"]))
+            for _ in range(count)
+        ]
+        for process in processes:
+            process.start()
+        totals = {}
+        for kind, count in (("writer", options["writers"]), ("reader", options["readers"])):
+            rows = [results[kind].get() for _ in range(count)]
+            totals[kind] = (sum(done for done, _ in rows), sum(errors for _, errors in rows))
+        for process in processes:
+            process.join()
+        return (*totals["writer"], *totals["reader"])
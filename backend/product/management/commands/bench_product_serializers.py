@@ -0,0 +1,86 @@
+import time
+from decimal import Decimal
+
+from backend.api.v1.product.serializers import (ProductReadSerializer,
+                                                ProductSerializer)
+from backend.product.models import Category, Ingredient, Product
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.test import RequestFactory
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ProductSerializer with fast ProductReadSerializer on 100, 1k and 10k products. "
+        "Products are created inside a transaction which is rolled back at the end. "
+        "Same output of both is checked by tests (FastReadSerializerTestCase)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100,1000,10000", help="comma separated product counts")
+        parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        request = RequestFactory().get("/api/v1/food/menu/")
+        context = {"request": request}
+
+        self.stdout.write(f"{'products':>9} {'drf':>10} {'fast(qs)':>10} {'fast(list)':>11} {'speedup':>8}")
+        for size in sizes:
+            with transaction.atomic():
+                self.create_products(size)
+                products = Product.objects.filter(is_active = True).order_by("created_at", "id")
+                prefetched = products.select_related("category").prefetch_related(
+                    Prefetch("ingredients", queryset=Ingredient.objects.only("name"))
+                )
+
+                drf_time = self.measure(
+                    lambda: ProductSerializer(prefetched.all(), many = True, context = context).data, options["repeat"]
+                )
+                fast_time = self.measure(
+                    lambda: ProductReadSerializer(products.all(), many = True, context = context).data, options["repeat"]
+                )
+                list_time = self.measure(
+                    lambda: ProductReadSerializer(list(prefetched.all()), many = True, context = context).data, options["repeat"]
+                )
+                self.stdout.write(
+                    f"{size:>9} {drf_time * 1000:>8.1f}ms {fast_time * 1000:>8.1f}ms "
+                    f"{list_time * 1000:>9.1f}ms {drf_time / fast_time:>7.1f}x"
+                )
+                transaction.set_rollback(True)
+
+
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            [dict(row) for row in func()]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+
+    def create_products(self, size):
+        category = Category.objects.create(name = f"bench category {size}", image = "product_images/no-food.webp")
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(name = f"bench ingredient {size} {number}") for number in range(20)]
+        )
+        products = Product.objects.bulk_create([
+            Product(
+                category = category,
+                name = f"bench product {size} {number}",
+                slug = f"bench-product-{size}-{number}",
+                description = "bench description " * 10,
+                original_price = Decimal("12.50") + number,
+                image = "product_images/no-food.webp",
+            )
+            for number in range(size)
+        ])
+        through = Product.ingredients.through
+        through.objects.bulk_create([
+            through(product_id = product.pk, ingredient_id = ingredients[(index + offset) % 20].pk)
+            for index, product in enumerate(products)
+            for offset in range(3)
+        ])
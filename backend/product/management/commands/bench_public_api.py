@@ -0,0 +1,54 @@
+import base64
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+PUBLIC_URLS = (
+    "/api/v1/food/categories/",
+    "/api/v1/food/menu/",
+    "/api/v1/restaurant/",
+    "/api/v1/restaurant/addresses/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time of public GET endpoints with full middleware & authentication "
+        "(PUBLIC_FAST_PATH = False) and with the fast path, with and without "
+        "a stray Authorization: Basic header."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="requests per url and mode")
+
+
+    def handle(self, *args, **options):
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ("*", "")), "localhost").lstrip(".")
+        client = Client(HTTP_HOST = host)
+        basic = "Basic " + base64.b64encode(b"+998900000000:wrong-password").decode()
+
+        self.stdout.write(f"{'url':<32} {'header':<7} {'full':>10} {'fast':>10} {'saved':>10}")
+        for url in PUBLIC_URLS:
+            for header in (None, basic):
+                extra = {"HTTP_AUTHORIZATION": header} if header else {}
+                with override_settings(PUBLIC_FAST_PATH = False):
+                    full = self.measure(client, url, extra, options["repeat"])
+                fast = self.measure(client, url, extra, options["repeat"])
+                self.stdout.write(
+                    f"{url:<32} {'basic' if header else '-':<7} {full * 1000:>8.2f}ms "
+                    f"{fast * 1000:>8.2f}ms {(full - fast) * 1000:>8.2f}ms"
+                )
+
+
+    def measure(self, client, url, extra, repeat):
+        """
+            return mean seconds of one request (first one is warm up)
+        """
+        client.get(url, **extra)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            client.get(url, **extra)
+        return (time.perf_counter() - start) / repeat
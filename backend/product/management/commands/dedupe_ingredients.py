@@ -0,0 +1,39 @@
+from backend.product.models import Ingredient, Product
+from backend.product.signals import touch_products
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+class Command(BaseCommand):
+    help = "Merge ingredients with the same (lower case) name, run it before adding unique ingredient name"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        through = Product.ingredients.through
+        duplicates = (
+            Ingredient.objects.annotate(lower_name = Lower("name")).values("lower_name")
+            .annotate(count = Count("id"), keep_id = Min("id")).filter(count__gt = 1)
+        )
+        merged = 0
+        for duplicate in duplicates:
+            ids = list(
+                Ingredient.objects.annotate(lower_name = Lower("name"))
+                .filter(lower_name = duplicate["lower_name"]).exclude(pk = duplicate["keep_id"])
+                .values_list("id", flat = True)
+            )
+            # PRODUCTS OF DUPLICATES GET THE KEPT INGREDIENT (IF THEY DON'T HAVE IT YET)
+            product_ids = set(through.objects.filter(ingredient_id__in = ids).values_list("product_id", flat = True))
+            product_ids -= set(
+                through.objects.filter(ingredient_id = duplicate["keep_id"]).values_list("product_id", flat = True)
+            )
+            through.objects.bulk_create(
+                [through(product_id = product_id, ingredient_id = duplicate["keep_id"]) for product_id in product_ids]
+            )
+            Ingredient.objects.filter(pk__in = ids).delete()
+            Ingredient.objects.filter(pk = duplicate["keep_id"]).update(name = duplicate["lower_name"])
+            # RENAME WITHOUT SIGNALS, PRODUCTS ARE CHANGED FOR DELTA SYNC HERE
+            touch_products(Product.objects.filter(ingredients = duplicate["keep_id"]).values_list("id", flat = True))
+            merged += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"{merged} duplicate ingredients merged."))
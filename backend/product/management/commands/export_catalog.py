@@ -0,0 +1,22 @@
+import sys
+
+from backend.product.catalog import CATALOG_FORMATS, export_catalog
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Export products with categories and ingredients as csv or jsonl (streamed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="output file, stdout if not given")
+        parser.add_argument("--format", choices=CATALOG_FORMATS, default="jsonl")
+
+
+    def handle(self, *args, **options):
+        output = open(options["path"], "w", encoding="utf-8", newline="") if options["path"] else sys.stdout
+        try:
+            for line in export_catalog(options["format"]):
+                output.write(line)
+        finally:
+            if options["path"]:
+                output.close()
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.product.images import IMAGE_VARIANT_FIELDS, make_image_variants
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Make missing thumb/card/full WEBP variants of every uploaded image (products, categories, media, avatars)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Make all variants again, also existing ones")
+        parser.add_argument("--workers", type=int, default=4, help="Images made at the same time")
+
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, field in IMAGE_VARIANT_FIELDS.items():
+            queryset = apps.get_model(label).objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            names.update(queryset.values_list(field, flat = True).distinct())
+
+        force = options["force"]
+        made = failed = 0
+        with ThreadPoolExecutor(max_workers = max(options["workers"], 1)) as executor:
+            futures = {name: executor.submit(make_image_variants, name, force) for name in sorted(names)}
+            for name, future in futures.items():
+                try:
+                    made += len(future.result())
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} images, {made} variants made, {failed} failed."))
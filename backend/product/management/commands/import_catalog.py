@@ -0,0 +1,27 @@
+import os
+
+from backend.product.catalog import CATALOG_FORMATS, import_catalog
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Import (create or update by name) products with categories and ingredients from csv or jsonl"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=CATALOG_FORMATS, help="by file extension if not given")
+
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or os.path.splitext(options["path"])[1].lstrip(".").lower()
+        if file_format not in CATALOG_FORMATS:
+            file_format = "jsonl"
+
+        with open(options["path"], encoding="utf-8", newline="") as lines:
+            report = import_catalog(lines, file_format)
+
+        for error in report["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} created, {report['updated']} updated, {len(report['errors'])} errors."
+        ))
@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from backend.product.models import MenuTombstone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete menu tombstones older than MENU_SYNC_TOMBSTONE_DAYS (such clients get full menu anyway)"
+
+    def handle(self, *args, **options):
+        border = timezone.now() - timedelta(days = settings.MENU_SYNC_TOMBSTONE_DAYS)
+        deleted, _ = MenuTombstone.objects.filter(deleted_at__lt = border).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} tombstones deleted."))
@@ -0,0 +1,12 @@
+from backend.product.cache import bump_menu_version
+from backend.product.snapshot import rebuild_menu_snapshot
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild ready to serve menu json of every category and the full menu"
+
+    def handle(self, *args, **options):
+        content, etag = rebuild_menu_snapshot()
+        bump_menu_version()
+        self.stdout.write(self.style.SUCCESS(f"Menu snapshot rebuilt: {len(content)} bytes, etag {etag}"))
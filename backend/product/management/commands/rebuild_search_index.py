@@ -0,0 +1,15 @@
+from backend.product.cache import bump_menu_version
+from backend.product.search import create_search_index, index_products
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild full text search index of products (FTS5 on sqlite, tsvector on postgres)"
+
+    def handle(self, *args, **options):
+        create_search_index()
+        with transaction.atomic():
+            index_products()
+        bump_menu_version()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -1,7 +1,6 @@
 from django.db import models
 from django.db.models import UniqueConstraint
 from django.utils.translation import gettext_lazy as _
-from django_resized import ResizedImageField
 
 from .utils import get_slugify, get_upload_path
 from .validators import (validate_discount_percent_maximum,
@@ -32,7 +31,7 @@ class Category(models.Model):
         verbose_name=_("SAFE URL"),
         help_text=_("format: required, letter, numbers, underscore.")
     )
-    image = ResizedImageField(
+    image = models.ImageField(
         verbose_name=_("The image for the category"),
         upload_to = get_upload_path,
         help_text = _("format: required"),
@@ -43,6 +42,12 @@ class Category(models.Model):
         default=True,
         help_text=_("defaul: True, if False will not show to customers")
     )
+    updated_at = models.DateTimeField(
+        auto_now= True,
+        db_index=True,
+        verbose_name=_("date category last updated"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
 
     class Meta:
         verbose_name = _("product category")
@@ -115,7 +120,7 @@ class Product(models.Model):
         verbose_name=_("product quantity"),
         default=1
     )
-    image = ResizedImageField(
+    image = models.ImageField(
         _("product image"),
         upload_to = get_upload_path,
         help_text=_("format: not required"),
@@ -139,6 +144,7 @@ class Product(models.Model):
     )
     updated_at = models.DateTimeField(
         auto_now= True,
+        db_index=True,
         verbose_name=_("date product last updated"),
         help_text=_("format: Y-m-d H:M:S")
     )
@@ -147,19 +153,39 @@ class Product(models.Model):
     class Meta:
         verbose_name = _("Product")
         verbose_name_plural = _("Products")
+        indexes = [
+            # FOR CURSOR PAGINATION ORDER BY (created_at, id)
+            models.Index(fields=["created_at", "id"], name="product_created_id_idx"),
+        ]
 
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # REMEMBER LOADED CATEGORY, IF IT WILL BE CHANGED OLD CATEGORY SNAPSHOT ALSO REBUILT
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        # AND SLUG, RENAMED PRODUCT LEAVES TOMBSTONE OF OLD SLUG FOR SYNC CLIENTS
+        instance._loaded_slug = instance.__dict__.get("slug")
+        return instance
+
     def save(self, *args, **kwargs):
+        self.set_computed_fields()
+        super().save(*args, **kwargs)
+
+
+    def set_computed_fields(self):
+        """
+            slug & discounted price, also used by bulk import where save() is not called
+        """
         slug_name = get_slugify(self.name)
         self.slug = slug_name
         # 
         if self.original_price and self.discount_percent:
             discount_amount = self.original_price * (self.discount_percent / 100)
             self.discounted_price = self.original_price - discount_amount
-        super().save(*args, **kwargs)
 
 
     def clean(self) -> None:
@@ -169,8 +195,32 @@ class Product(models.Model):
 
 
 # FOR INGREDIENT TABLE
+class IngredientManager(models.Manager):
+    def resolve(self, names):
+        """
+            Ingredients for given names (lower case), missing ones are created.
+            Constant queries for any count of names: one SELECT ... IN, one
+            bulk INSERT (conflicts ignored, unique name) and one SELECT of created.
+            Misali:
+                Ingredient.objects.resolve(["Cheese", "tomato"]) -> [<cheese>, <tomato>]
+        """
+        names = list(dict.fromkeys(name.lower() for name in names))
+        if not names:
+            return []
+
+        ingredients = {ingredient.name: ingredient for ingredient in self.filter(name__in = names)}
+        missing = [name for name in names if name not in ingredients]
+        if missing:
+            self.bulk_create([self.model(name = name) for name in missing], ignore_conflicts = True)
+            ingredients.update({ingredient.name: ingredient for ingredient in self.filter(name__in = missing)})
+        return [ingredients[name] for name in names]
+
+
+
 class Ingredient(models.Model):
-    name = models.CharField(_("ingredient name"), max_length=150, unique=False)
+    name = models.CharField(_("ingredient name"), max_length=150, unique=True)
+
+    objects = IngredientManager()
 
     def __str__(self):
         return f"{self.name}, id {self.pk}"
@@ -211,4 +261,82 @@ class Ingredient(models.Model):
 
 #     def __str__(self):
 #         return f"{self.name}, id {self.pk}"
-# END FOR INGREDIENT TABLE 
\ No newline at end of file
+# END FOR INGREDIENT TABLE
+
+
+# MENU SNAPSHOT TABLE
+class MenuSnapshot(models.Model):
+    """
+        Ready to serve json of the menu. One row for each category
+        (key = category slug) and one row for the full menu (key = "")
+    """
+    key = models.CharField(
+        _("category slug or empty for full menu"),
+        max_length=100,
+        unique=True,
+        blank=True
+    )
+    content = models.BinaryField(_("rendered json"))
+    etag = models.CharField(_("etag of content"), max_length=64)
+    updated_at = models.DateTimeField(
+        auto_now= True,
+        verbose_name=_("date snapshot last rebuilt"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
+
+    class Meta:
+        verbose_name = _("Menu snapshot")
+        verbose_name_plural = _("Menu snapshots")
+
+
+    def __str__(self):
+        return self.key or "full menu"
+# END MENU SNAPSHOT TABLE
+
+
+# MENU VERSION TABLE
+class MenuVersion(models.Model):
+    """
+        One row: version of the menu for cache keys (backend/product/cache.py).
+        In database so every worker and management command sees the same
+        version, also with local memory cache.
+    """
+    version = models.BigIntegerField(_("menu version"), default=0)
+
+    class Meta:
+        verbose_name = _("Menu version")
+        verbose_name_plural = _("Menu version")
+
+
+    def __str__(self):
+        return str(self.version)
+# END MENU VERSION TABLE
+
+
+# MENU TOMBSTONE TABLE
+class MenuTombstone(models.Model):
+    """
+        Deleted products & categories for delta sync (/food/menu/changes/)
+    """
+    KIND = (
+        ('product', 'Product'),
+        ('category', 'Category'),
+    )
+    kind = models.CharField(_("kind of deleted object"), max_length=10, choices=KIND)
+    object_id = models.BigIntegerField(_("id of deleted object"))
+    slug = models.CharField(_("slug of deleted object"), max_length=200)
+    deleted_at = models.DateTimeField(
+        auto_now_add= True,
+        db_index=True,
+        verbose_name=_("date object deleted"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
+
+    class Meta:
+        verbose_name = _("Menu tombstone")
+        verbose_name_plural = _("Menu tombstones")
+
+
+    def __str__(self):
+        return f"{self.kind} {self.slug}"
+# END MENU TOMBSTONE TABLE
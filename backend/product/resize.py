@@ -0,0 +1,195 @@
+import hashlib
+import io
+import os
+import posixpath
+import threading
+from functools import lru_cache
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from PIL import Image, ImageOps
+
+from .images import get_image_state
+
+RESIZE_SALT = "backend.product.resize"
+
+_cache_bytes = None
+_cache_lock = threading.Lock()
+
+
+def get_resize_signature(width, height, name, version=""):
+    value = f"{width}x{height}/{name}/{version}"
+    return salted_hmac(RESIZE_SALT, value).hexdigest()[:16]
+
+
+
+def check_resize_signature(width, height, name, version, signature):
+    return constant_time_compare(get_resize_signature(width, height, name, version), signature or "")
+
+
+
+def get_source_version(name):
+    """
+        mtime of original, new upload with the same name -> new url
+    """
+    return str(os.stat(default_storage.path(name)).st_mtime_ns)
+
+
+
+def get_resized_image_url(name, width, height, request=None):
+    """
+        Signed url of image resized to fit width x height (size must be in
+        IMAGE_RESIZE_SIZES).
+        Misali:
+            get_resized_image_url("product_images/lavash.png", 640, 480)
+                -> /media/resize/640x480/product_images/lavash.png?v=1690000000&s=5f2b...
+    """
+    if f"{width}x{height}" not in settings.IMAGE_RESIZE_SIZES:
+        raise ValueError(f"{width}x{height} is not in IMAGE_RESIZE_SIZES")
+    name = str(name)
+    return make_resized_image_url(name, width, height, get_source_version(name), request)
+
+
+
+def get_resized_image_urls(name, request=None):
+    """
+        {"160x160": signed url, ...} for every size of IMAGE_RESIZE_SIZES,
+        {} if image is not in IMAGE_RESIZE_DIRS or its file is missing.
+        Version is from get_image_state (kept in memory) and urls of one
+        version are signed once, serializers call it for every row.
+    """
+    if not name:
+        return {}
+    name = str(name)
+    if not is_allowed_source(name):
+        return {}
+    version = get_image_state(name).version
+    if version is None:
+        return {}
+    paths = get_resized_image_paths(name, version, tuple(settings.IMAGE_RESIZE_SIZES))
+    if request is None:
+        return dict(paths)
+    return {size: request.build_absolute_uri(path) for size, path in paths}
+
+
+
+@lru_cache(maxsize=4096)
+def get_resized_image_paths(name, version, sizes):
+    return tuple(
+        (size, make_resized_image_url(name, *map(int, size.split("x")), version))
+        for size in sizes
+    )
+
+
+
+def make_resized_image_url(name, width, height, version, request=None):
+    url = reverse("resize_image", kwargs = {"width": width, "height": height, "name": name})
+    url = f"{quote(url)}?{urlencode({'v': version, 's': get_resize_signature(width, height, name, version)})}"
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+
+def is_allowed_source(name):
+    """
+        Only images of IMAGE_RESIZE_DIRS, no ../ and absolute paths
+    """
+    normalized = posixpath.normpath(name)
+    if normalized != name or normalized.startswith(("/", "..")):
+        return False
+    return normalized.startswith(tuple(settings.IMAGE_RESIZE_DIRS))
+
+
+
+def get_cached_path(width, height, name):
+    """
+        Cached file of this size and this version of original (mtime), so
+        a changed original is never served from old cache.
+    """
+    source = os.stat(default_storage.path(name))
+    key = f"{width}x{height}:{name}:{source.st_mtime_ns}:{source.st_size}"
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return os.path.join(settings.IMAGE_RESIZE_CACHE_DIR, digest[:2], f"{digest}.webp")
+
+
+
+def get_resized_image(width, height, name):
+    """
+        return path of resized image from disk cache, resized & cached on
+        first request.
+    """
+    path = get_cached_path(width, height, name)
+    if os.path.exists(path):
+        # LRU, RECENTLY USED FILES ARE EVICTED LAST
+        os.utime(path)
+        return path
+
+    with default_storage.open(name, "rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    image.thumbnail((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality = settings.IMAGE_RESIZE_QUALITY, method = 4)
+    content = buffer.getvalue()
+
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    # OTHER WORKER CAN WRITE THE SAME FILE, WHOLE FILE APPEARS AT ONCE
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(content)
+    os.replace(temporary, path)
+    add_cache_bytes(len(content))
+    return path
+
+
+
+def scan_cache():
+    """
+        return [(atime or mtime, size, path)] of cached files
+    """
+    files = []
+    for directory, _, names in os.walk(settings.IMAGE_RESIZE_CACHE_DIR):
+        for filename in names:
+            if not filename.endswith(".webp"):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+    return files
+
+
+
+def add_cache_bytes(size):
+    """
+        Size of cache is counted in memory (scanned only the first time),
+        when it is more than IMAGE_RESIZE_CACHE_MAX_BYTES least recently
+        used files are removed until 90% of limit.
+    """
+    global _cache_bytes
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in scan_cache())
+        else:
+            _cache_bytes += size
+        if _cache_bytes <= settings.IMAGE_RESIZE_CACHE_MAX_BYTES:
+            return
+
+        files = sorted(scan_cache())
+        total = sum(size for _, size, _ in files)
+        target = settings.IMAGE_RESIZE_CACHE_MAX_BYTES * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        _cache_bytes = total
@@ -0,0 +1,133 @@
+import re
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Product
+
+SEARCH_TABLE = "product_search"
+SEARCH_INDEX_BATCH_SIZE = 500
+
+
+def create_search_index(sender=None, using="default", **kwargs):
+    """
+        post_migrate: create search table if it is not exists.
+            - sqlite   -> FTS5 virtual table (rowid = product id)
+            - postgres -> tsvector column with GIN index
+    """
+    db = connections[using]
+    with db.cursor() as cursor:
+        if db.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                "USING fts5(name, category, ingredients, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        elif db.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"product_id bigint PRIMARY KEY REFERENCES {Product._meta.db_table} (id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+
+def get_search_terms(query):
+    """
+        Only words from user query, so it can't break FTS syntax
+        Misali:
+            'Pizza "4 sir"' -> ['pizza', '4', 'sir']
+    """
+    return re.findall(r"\w+", query.lower())
+
+
+
+def search_product_ids(query, limit=None):
+    """
+        Product ids ordered by rank, best first.
+        return None if database has no search backend (then caller filters with LIKE)
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return []
+    limit = limit or settings.SEARCH_MAX_RESULTS
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # NAME IS MORE IMPORTANT THAN INGREDIENTS, INGREDIENTS MORE THAN CATEGORY
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 2.0, 5.0) LIMIT %s",
+                [" ".join(f'"{term}"*' for term in terms), limit]
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"SELECT product_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+                "WHERE document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s",
+                [" & ".join(f"{term}:*" for term in terms), limit]
+            )
+        else:
+            return None
+        return [row[0] for row in cursor.fetchall()]
+
+
+
+def get_search_rows(products):
+    """
+        (id, name, category name, ingredient names) of products
+    """
+    ingredients = {}
+    through = Product.ingredients.through.objects.filter(product__in = products)
+    for product_id, name in through.values_list("product_id", "ingredient__name"):
+        ingredients.setdefault(product_id, []).append(name)
+
+    for product_id, name, category in products.values_list("id", "name", "category__name"):
+        yield product_id, name, category, " ".join(ingredients.get(product_id, []))
+
+
+
+def index_products(product_ids=None, category_ids=None):
+    """
+        Rewrite search rows of given products and of all products of given
+        categories. Both None -> whole index is rebuilt.
+    """
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return
+
+    rebuild_all = product_ids is None and category_ids is None
+    products = Product.objects.order_by()
+    if not rebuild_all:
+        products = products.filter(Q(pk__in = product_ids or []) | Q(category__in = category_ids or []))
+    rows = list(get_search_rows(products))
+
+    with connection.cursor() as cursor:
+        if rebuild_all:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        else:
+            # DELETED PRODUCTS ARE NOT IN ROWS, SO THEIR OLD ROWS ARE REMOVED BY GIVEN IDS
+            stale_ids = list(set(product_ids or []) | {row[0] for row in rows})
+            id_column = "rowid" if connection.vendor == "sqlite" else "product_id"
+            for start in range(0, len(stale_ids), SEARCH_INDEX_BATCH_SIZE):
+                batch = stale_ids[start:start + SEARCH_INDEX_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {id_column} IN ({placeholders})", batch)
+
+        for start in range(0, len(rows), SEARCH_INDEX_BATCH_SIZE):
+            batch = rows[start:start + SEARCH_INDEX_BATCH_SIZE]
+            if connection.vendor == "sqlite":
+                cursor.executemany(
+                    f"INSERT INTO {SEARCH_TABLE} (rowid, name, category, ingredients) VALUES (%s, %s, %s, %s)",
+                    batch
+                )
+            else:
+                # NAME (A) > INGREDIENTS (B) > CATEGORY (C)
+                cursor.executemany(
+                    f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+                    "setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'C') || "
+                    "setweight(to_tsvector('simple', %s), 'B'))",
+                    batch
+                )
@@ -0,0 +1,155 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_menu_version
+from .models import Category, Ingredient, MenuTombstone, Product
+from .search import index_products
+from .snapshot import rebuild_menu_snapshot
+
+ALL = None
+
+
+class MenuChanges(threading.local):
+    """
+        Changed parts of the menu in current transaction, ALL (None) means everything
+            - categories -> snapshot fragments to rebuild
+            - products -> search rows to rewrite
+            - renamed_categories -> search rows of all their products to rewrite
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.categories = set()
+        self.products = set()
+        self.renamed_categories = set()
+
+    def add(self, name, ids):
+        current = getattr(self, name)
+        setattr(self, name, ALL if current is ALL or ids is ALL else current | set(ids))
+
+
+_changes = MenuChanges()
+
+
+def schedule_menu_rebuild(categories=(), products=(), renamed_categories=()):
+    """
+        Collect changes of this transaction and apply them once after commit.
+    """
+    connection = transaction.get_connection()
+    scheduled = connection.in_atomic_block and any(
+        callback[1] is flush_menu_changes for callback in connection.run_on_commit
+    )
+    if not scheduled:
+        _changes.reset()
+
+    _changes.add("categories", categories)
+    _changes.add("products", products)
+    _changes.add("renamed_categories", renamed_categories)
+
+    if not scheduled:
+        transaction.on_commit(flush_menu_changes)
+
+
+
+def flush_menu_changes():
+    """
+        Snapshot and search index are rebuilt first and only then cache version
+        is bumped, other way a request can cache old data under new version.
+    """
+    categories, products, renamed_categories = _changes.categories, _changes.products, _changes.renamed_categories
+    _changes.reset()
+    if categories is ALL or categories:
+        rebuild_menu_snapshot(categories)
+    if products is ALL or renamed_categories is ALL:
+        index_products()
+    elif products or renamed_categories:
+        index_products(product_ids = products, category_ids = renamed_categories)
+    bump_menu_version()
+
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    categories = {instance.category_id, getattr(instance, "_loaded_category_id", None)}
+    schedule_menu_rebuild(categories = categories - {None}, products = {instance.pk})
+
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    schedule_menu_rebuild(categories = {instance.pk}, renamed_categories = {instance.pk})
+
+
+
+def touch_products(product_ids):
+    """
+        Ingredients are in product json, so products of changed ingredients
+        get new updated_at for delta sync (/menu/changes/), without signals.
+    """
+    if product_ids:
+        Product.objects.filter(pk__in = product_ids).update(updated_at = timezone.now())
+
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    # AFTER DELETE PRODUCTS OF INGREDIENT ARE NOT KNOWN (ROWS OF THROUGH TABLE ARE GONE)
+    instance._product_ids = list(Product.objects.filter(ingredients = instance).values_list("id", flat = True))
+
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredient_changed(sender, instance, created=False, **kwargs):
+    if created:
+        # NEW INGREDIENT IS NOT IN ANY PRODUCT YET, M2M SIGNAL WILL COME
+        return
+    product_ids = getattr(instance, "_product_ids", None)
+    if product_ids is None:
+        product_ids = Product.objects.filter(ingredients = instance).values_list("id", flat = True)
+    touch_products(product_ids)
+    # INGREDIENT CAN BE IN ANY CATEGORY
+    schedule_menu_rebuild(categories = ALL, products = ALL)
+
+
+
+@receiver(m2m_changed, sender=Product.ingredients.through)
+def product_ingredients_changed(sender, instance, action, pk_set=None, **kwargs):
+    if action == "pre_clear" and not isinstance(instance, Product):
+        # ingredient.product_set.clear(), AFTER IT PRODUCTS ARE NOT KNOWN
+        instance._product_ids = list(Product.objects.filter(ingredients = instance).values_list("id", flat = True))
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, Product):
+        touch_products([instance.pk])
+        schedule_menu_rebuild(categories = {instance.category_id}, products = {instance.pk})
+    else:
+        # ingredient.product_set CHANGED, pk_set ARE PRODUCTS (EMPTY ON CLEAR)
+        touch_products(pk_set or getattr(instance, "_product_ids", []))
+        schedule_menu_rebuild(categories = ALL, products = pk_set or ALL)
+
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def leave_tombstone(sender, instance, **kwargs):
+    """
+        Sync clients must know about deleted rows
+    """
+    MenuTombstone.objects.create(kind = sender._meta.model_name, object_id = instance.pk, slug = instance.slug)
+
+
+
+@receiver(post_save, sender=Product)
+def leave_tombstone_of_old_slug(sender, instance, created, **kwargs):
+    # PRODUCT IS KNOWN BY SLUG, AFTER RENAME OLD SLUG IS DELETED FOR CLIENTS
+    old_slug = getattr(instance, "_loaded_slug", None)
+    if not created and old_slug and old_slug != instance.slug:
+        MenuTombstone.objects.create(kind = "product", object_id = instance.pk, slug = old_slug)
+    # ALSO FOR NEW OBJECT, IT CAN BE RENAMED LATER (NOT LOADED BY from_db)
+    instance._loaded_slug = instance.slug
@@ -0,0 +1,155 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .models import Category, MenuSnapshot, Product
+
+MENU_SNAPSHOT_ALL = ""
+# PLACE OF ORIGIN IN SAVED SNAPSHOT: QUOTE + RAW NUL BYTE. JSON RENDERER
+# ESCAPES EVERY CONTROL CHAR OF TEXT ("\u0000"), SO ONLY OUR URLS HAVE IT
+SNAPSHOT_ORIGIN = b'"\x00'
+# (etag, origin) -> (content, etag) FOR THIS ORIGIN
+SNAPSHOT_CONTENT_CACHE_SIZE = 64
+
+
+class SnapshotRequest:
+    """
+        Snapshot is rendered without a request, image urls get marker
+        (random for every render, text of product can't have it) instead
+        of scheme & host. render_products makes it SNAPSHOT_ORIGIN, it is
+        replaced with origin of every request (get_snapshot_content), so
+        urls are absolute like in all other responses.
+    """
+    def __init__(self):
+        self.marker = f"\x00origin-{secrets.token_hex(16)}"
+
+
+    def build_absolute_uri(self, location):
+        return self.marker + location
+
+
+
+def render_products(products):
+    """
+        Same json as ProductListApiView gives for these products
+    """
+    from backend.api.v1.product.serializers import ProductReadSerializer
+
+    request = SnapshotRequest()
+    serializer = ProductReadSerializer(products, many = True, context = {"request": request})
+    content = JSONRenderer().render(serializer.data)
+    # MARKER IN JSON: "\u0000origin-<random>
+    marker = JSONRenderer().render(request.marker)[:-1]
+    return content.replace(marker, SNAPSHOT_ORIGIN)
+
+
+
+def save_snapshot(key, content):
+    etag = quote_etag(hashlib.md5(content).hexdigest())
+    MenuSnapshot.objects.update_or_create(key = key, defaults = {"content": content, "etag": etag})
+    return content, etag
+
+
+
+def rebuild_category_snapshot(category):
+    products = Product.objects.filter(is_active = True, category = category).order_by("created_at", "id")
+    return save_snapshot(category.slug, render_products(products))
+
+
+
+def rebuild_full_snapshot():
+    """
+        Full menu is only glued from category fragments,
+        products are not touched again.
+    """
+    fragments = MenuSnapshot.objects.exclude(key = MENU_SNAPSHOT_ALL)
+    # CATEGORY WAS RENAMED OR DELETED -> ITS OLD FRAGMENT IS NOT NEEDED
+    fragments.exclude(key__in = Category.objects.values("slug")).delete()
+    parts = []
+    for content in fragments.order_by("key").values_list("content", flat = True):
+        content = bytes(content)
+        if len(content) > 2:
+            parts.append(content[1:-1])
+    return save_snapshot(MENU_SNAPSHOT_ALL, b"[" + b",".join(parts) + b"]")
+
+
+
+@transaction.atomic
+def rebuild_menu_snapshot(category_ids=None):
+    """
+        Rebuild fragments of given categories (all if None) and then full menu
+    """
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in = category_ids)
+    for category in categories:
+        rebuild_category_snapshot(category)
+    return rebuild_full_snapshot()
+
+
+
+def get_menu_snapshot(key=MENU_SNAPSHOT_ALL):
+    """
+        return (content, etag) or None if there is no such category.
+        Missing snapshot is built at first request.
+    """
+    snapshot = MenuSnapshot.objects.filter(key = key).values_list("content", "etag").first()
+    if snapshot is not None:
+        return bytes(snapshot[0]), snapshot[1]
+
+    if key == MENU_SNAPSHOT_ALL:
+        return rebuild_menu_snapshot()
+
+    category = Category.objects.filter(slug = key).first()
+    if category is None:
+        return None
+    snapshot = rebuild_category_snapshot(category)
+    rebuild_full_snapshot()
+    return snapshot
+
+
+_snapshot_contents = OrderedDict()
+_snapshot_contents_lock = threading.Lock()
+
+
+def get_snapshot_content(snapshot, request):
+    """
+        (content, etag) of snapshot for this request: image urls with
+        origin of request (http://host), etag is different for every origin.
+        Made once per (etag, origin) in this process, etag is md5 of content.
+    """
+    content, etag = snapshot
+    origin = request.build_absolute_uri("/").rstrip("/")
+    key = (etag, origin)
+    with _snapshot_contents_lock:
+        if key in _snapshot_contents:
+            _snapshot_contents.move_to_end(key)
+            return _snapshot_contents[key]
+
+    result = (
+        content.replace(SNAPSHOT_ORIGIN, b'"' + origin.encode()),
+        quote_etag(hashlib.md5(f"{etag}:{origin}".encode()).hexdigest()),
+    )
+    with _snapshot_contents_lock:
+        _snapshot_contents[key] = result
+        while len(_snapshot_contents) > SNAPSHOT_CONTENT_CACHE_SIZE:
+            _snapshot_contents.popitem(last = False)
+    return result
+
+
+
+async def aget_menu_snapshot(key=MENU_SNAPSHOT_ALL):
+    """
+        get_menu_snapshot for async views, ready snapshot is read with
+        async ORM, missing one is built in a thread (transaction).
+    """
+    snapshot = await MenuSnapshot.objects.filter(key = key).values_list("content", "etag").afirst()
+    if snapshot is not None:
+        return bytes(snapshot[0]), snapshot[1]
+    return await sync_to_async(get_menu_snapshot)(key)
@@ -1,3 +1,948 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from backend.api.v1.admin_dashboard.serializers import ProductUpdateSerializer
+from backend.api.v1.product import async_views
+from backend.api.v1.product.serializers import (CategoryReadSerializer,
+                                                CategorySerializer,
+                                                ProductReadSerializer,
+                                                ProductSerializer)
+from backend.api.v1.product.utils import make_sync_token
+from backend.api.v1.viewsets.middleware import CompressionMiddleware
+from backend.api.v1.viewsets.utils import streaming_response
+from backend.product.catalog import import_catalog
+from backend.product.images import get_variant_name, make_image_variants
+from backend.product.models import (Category, Ingredient, MenuTombstone,
+                                    MenuVersion, Product)
+from backend.product.resize import (get_resize_signature, get_resized_image,
+                                    get_resized_image_url,
+                                    get_resized_image_urls)
+from backend.product.snapshot import get_menu_snapshot, get_snapshot_content
+from backend.tasks.models import Task
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F, Prefetch
+from django.http import HttpResponse
+from django.test import (AsyncRequestFactory, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 
 # Create your tests here.
+
+
+class IngredientResolveTestCase(TestCase):
+    """
+        Ingredients of product are resolved with constant count of queries
+    """
+    def setUp(self):
+        self.category = Category.objects.create(name="pizza", image="category_images/pizza.webp")
+        Ingredient.objects.create(name="cheese")
+
+
+    def create_product(self, name, ingredient_names):
+        serializer = ProductSerializer(data={
+            "category": "Pizza",
+            "name": name,
+            "description": "description",
+            "original_price": "10.00",
+            "ingredients": [{"name": ingredient_name} for ingredient_name in ingredient_names],
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+
+    def test_resolve_creates_only_missing_ingredients(self):
+        ingredients = Ingredient.objects.resolve(["Cheese", "tomato", "cheese"])
+        self.assertEqual([ingredient.name for ingredient in ingredients], ["cheese", "tomato"])
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+
+    def test_create_product_queries_do_not_grow_with_ingredients(self):
+        # 9 = ... + updated_at OF PRODUCT AFTER INGREDIENTS ARE ADDED (DELTA SYNC)
+        serializer = self.create_product("Margherita", ["cheese", "tomato"])
+        with self.assertNumQueries(9):
+            serializer.save()
+
+        names = ["cheese"] + [f"ingredient {number}" for number in range(15)]
+        serializer = self.create_product("Pepperoni", names)
+        with self.assertNumQueries(9):
+            product = serializer.save()
+        self.assertEqual(product.ingredients.count(), 16)
+
+
+    def test_update_product_queries_do_not_grow_with_ingredients(self):
+        product = self.create_product("Margherita", ["cheese", "tomato"]).save()
+        for count in (3, 15):
+            names = ["cheese"] + [f"ingredient {count} {number}" for number in range(count)]
+            serializer = ProductUpdateSerializer(product, data={
+                "name": "Margherita",
+                "description": "description",
+                "original_price": "10.00",
+                "is_active": True,
+                "ingredients": [{"name": name} for name in names],
+            })
+            serializer.is_valid(raise_exception=True)
+            # 12 = ... + updated_at OF PRODUCT AFTER INGREDIENTS ARE REMOVED AND ADDED
+            with self.assertNumQueries(12):
+                serializer.save()
+            self.assertEqual(
+                sorted(product.ingredients.values_list("name", flat=True)), sorted(names)
+            )
+
+
+
+class FastReadSerializerTestCase(TestCase):
+    """
+        Fast read serializers give the same json as DRF serializers, from
+        queryset (values) and from list of objects (page)
+    """
+    def setUp(self):
+        # INGREDIENT IDS NOT IN ORDER OF NAMES
+        Ingredient.objects.resolve(["tomato", "basil", "cheese"])
+        self.category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        Category.objects.create(name="Drinks", image="category_images/drinks.webp", is_active = False)
+        for number, names in enumerate((["cheese", "tomato", "basil"], [], ["basil"])):
+            product = Product.objects.create(
+                category = self.category, name = f"Pizza {number}", description = "description",
+                original_price = Decimal("10.50") + number, discount_percent = Decimal("15.00") if number else None,
+                image = "product_images/pizza.webp", is_active = True,
+            )
+            product.ingredients.set(Ingredient.objects.filter(name__in = names))
+        self.context = {"request": RequestFactory().get("/api/v1/food/menu/")}
+
+
+    def test_products(self):
+        products = Product.objects.order_by("created_at", "id")
+        prefetched = products.select_related("category").prefetch_related(
+            Prefetch("ingredients", queryset=Ingredient.objects.only("name"))
+        )
+        for fields in (None, ["name", "ingredients"], ["image_variants", "category", "original_price"]):
+            drf = ProductSerializer(prefetched.all(), many = True, context = self.context, fields = fields).data
+            self.assertEqual(ProductReadSerializer(products.all(), many = True, context = self.context, fields = fields).data, drf)
+            self.assertEqual(ProductReadSerializer(list(prefetched.all()), many = True, context = self.context, fields = fields).data, drf)
+            self.assertEqual(ProductReadSerializer(prefetched.first(), context = self.context, fields = fields).data, drf[0])
+
+
+    def test_categories(self):
+        categories = Category.objects.order_by("id")
+        for fields in (None, ["name", "image_variants"]):
+            drf = CategorySerializer(categories.all(), many = True, context = self.context, fields = fields).data
+            self.assertEqual(CategoryReadSerializer(categories.all(), many = True, context = self.context, fields = fields).data, drf)
+            self.assertEqual(CategoryReadSerializer(list(categories.all()), many = True, context = self.context, fields = fields).data, drf)
+
+
+
+class CatalogImportTestCase(TestCase):
+    """
+        Import updates only given columns of existing products
+    """
+    def setUp(self):
+        self.category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        self.product = Product.objects.create(
+            category = self.category, name = "Margherita", description = "old", original_price = Decimal("10.00"),
+            discount_percent = Decimal("10.00"), quantity = 3, image = "product_images/margherita.webp", is_active = False,
+        )
+        self.product.ingredients.set(Ingredient.objects.resolve(["cheese", "tomato"]))
+        Product.objects.filter(pk = self.product.pk).update(updated_at = timezone.now() - timedelta(days=1))
+
+
+    def import_rows(self, *rows):
+        return import_catalog([json.dumps(row) for row in rows])
+
+
+    def test_update_keeps_columns_not_given(self):
+        report = self.import_rows({"category": "Pizza", "name": "Margherita", "description": "new", "original_price": "12.00"})
+        self.assertEqual((report["created"], report["updated"]), (0, 1))
+
+        product = Product.objects.get(pk = self.product.pk)
+        self.assertEqual(product.description, "new")
+        self.assertEqual(str(product.original_price), "12.00")
+        self.assertEqual(str(product.discount_percent), "10.00")
+        self.assertEqual(product.quantity, 3)
+        self.assertEqual(product.image.name, "product_images/margherita.webp")
+        self.assertFalse(product.is_active)
+        self.assertEqual(sorted(product.ingredients.values_list("name", flat=True)), ["cheese", "tomato"])
+        # /menu/changes/ SEES THE IMPORTED CHANGE
+        self.assertGreater(product.updated_at, timezone.now() - timedelta(minutes=1))
+
+
+    def test_update_replaces_given_ingredients(self):
+        self.import_rows({
+            "category": "Pizza", "name": "Margherita", "description": "old",
+            "original_price": "10.00", "ingredients": ["basil"],
+        })
+        self.assertEqual(list(self.product.ingredients.values_list("name", flat=True)), ["basil"])
+
+
+    def test_new_product_gets_defaults(self):
+        self.import_rows({"category": "Pizza", "name": "Diavola", "description": "hot", "original_price": "11.00"})
+        product = Product.objects.get(name = "Diavola")
+        self.assertTrue(product.is_active)
+        self.assertEqual(product.quantity, 1)
+        self.assertIsNone(product.discount_percent)
+        self.assertEqual(product.image.name, "product_images/no-food.webp")
+        self.assertEqual(product.ingredients.count(), 0)
+
+
+    def test_new_category_gets_default_image(self):
+        self.import_rows({"category": "salads", "name": "Caesar", "description": "fresh", "original_price": "7.00"})
+        category = Category.objects.get(slug = "salads")
+        self.assertEqual(category.name, "Salads")
+        self.assertEqual(category.image.name, "product_images/no-food.webp")
+
+
+    def test_category_with_same_slug_is_error_of_row(self):
+        Category.objects.create(name="Hot-dog", image="category_images/hot-dog.webp")
+        report = self.import_rows(
+            {"category": "Hot dog", "name": "Classic", "description": "hot dog", "original_price": "5.00"},
+            {"category": "Pizza", "name": "Diavola", "description": "hot", "original_price": "11.00"},
+        )
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([error["line"] for error in report["errors"]], [1])
+        self.assertIn("category", report["errors"][0]["errors"])
+        self.assertFalse(Product.objects.filter(name = "Classic").exists())
+        self.assertTrue(Product.objects.filter(name = "Diavola").exists())
+
+
+
+class MenuSnapshotTestCase(TestCase):
+    """
+        /menu/?all=1 (snapshot) gives the same json as paged /menu/
+    """
+    def setUp(self):
+        self.category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        for number in range(3):
+            product = Product.objects.create(
+                category = self.category, name = f"Pizza {number}", description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+            product.ingredients.set(Ingredient.objects.resolve(["cheese"]))
+
+
+    def test_snapshot_has_absolute_urls_like_serializer(self):
+        snapshot = self.client.get("/api/v1/food/menu/", {"all": 1})
+        paged = self.client.get("/api/v1/food/menu/", {"page_size": 100})
+        self.assertEqual(snapshot.status_code, 200)
+        self.assertEqual(snapshot.json(), paged.json()["results"])
+        self.assertTrue(snapshot.json()[0]["image"].startswith("http://testserver/media/"))
+
+        other_host = self.client.get("/api/v1/food/menu/", {"all": 1}, HTTP_HOST="foodify.uz")
+        self.assertTrue(other_host.json()[0]["image"].startswith("http://foodify.uz/media/"))
+        self.assertNotEqual(other_host["ETag"], snapshot["ETag"])
+
+
+    def test_text_like_origin_marker_is_not_replaced(self):
+        # NUL IS NOT ALLOWED BY API, BUT SHELL / BULK QUERIES CAN WRITE IT
+        Product.objects.filter(name = "Pizza 0").update(description = "\x00origin/media/x.webp", name = "\x00origin")
+        snapshot = self.client.get("/api/v1/food/menu/", {"all": 1})
+        self.assertEqual(snapshot.json(), self.client.get("/api/v1/food/menu/", {"page_size": 100}).json()["results"])
+        product = next(product for product in snapshot.json() if product["name"] == "\x00origin")
+        self.assertEqual(product["description"], "\x00origin/media/x.webp")
+
+
+    def test_content_is_made_once_per_origin(self):
+        snapshot = get_menu_snapshot()
+        request = RequestFactory().get("/")
+        content, etag = get_snapshot_content(snapshot, request)
+        self.assertIs(get_snapshot_content(snapshot, request)[0], content)
+        self.assertNotIn(b"\x00", content)
+
+        other_host = get_snapshot_content(snapshot, RequestFactory().get("/", HTTP_HOST = "foodify.uz"))
+        self.assertNotEqual(other_host[1], etag)
+        self.assertEqual(other_host[0], content.replace(b"http://testserver/", b"http://foodify.uz/"))
+
+
+    def test_menu_without_params_is_first_page(self):
+        response = self.client.get("/api/v1/food/menu/", {"page_size": 2})
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIsNotNone(response.json()["next"])
+        self.assertIn("results", self.client.get("/api/v1/food/menu/").json())
+
+
+
+class AsyncViewsTestCase(TestCase):
+    """
+        Async client views (ASYNC_CLIENT_VIEWS) give the same json, ETag
+        and 304 as the DRF views, from cache and on cache miss
+    """
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        for number in range(3):
+            Product.objects.create(
+                category = category, name = f"Pizza {number}", description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+
+
+    def call(self, view, path, params=None, **headers):
+        response = async_to_sync(view)(RequestFactory().get(path, params or {}, **headers))
+        # ON CACHE MISS DRF RESPONSE, HANDLER RENDERS IT
+        return response.render() if hasattr(response, "render") else response
+
+
+    def assertSameResponse(self, async_response, sync_response):
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_response.get("ETag"), sync_response.get("ETag"))
+
+
+    def test_menu_first_page(self):
+        for params in ({}, {"page_size": 2}, {"category": "pizza"}, {"category": "burger"}, {"all": 1}):
+            # CACHE MISS (BY SYNC VIEW IN THREAD), THEN FROM CACHE
+            cache.clear()
+            async_response = self.call(async_views.product_list, "/api/v1/food/menu/", params)
+            sync_response = self.client.get("/api/v1/food/menu/", params)
+            self.assertSameResponse(async_response, sync_response)
+            self.assertSameResponse(self.call(async_views.product_list, "/api/v1/food/menu/", params), sync_response)
+
+
+    def test_menu_from_cache_without_sync_view(self):
+        sync_response = self.client.get("/api/v1/food/menu/")
+        with mock.patch.object(async_views, "product_list_view") as product_list_view, self.assertNumQueries(1):
+            # ONLY MENU VERSION
+            async_response = self.call(async_views.product_list, "/api/v1/food/menu/")
+        product_list_view.assert_not_called()
+        self.assertSameResponse(async_response, sync_response)
+
+
+    def test_not_modified(self):
+        for path, view, params in (
+            ("/api/v1/food/menu/", async_views.product_list, {}),
+            ("/api/v1/food/menu/", async_views.product_list, {"all": 1}),
+            ("/api/v1/food/categories/", async_views.category_list, {}),
+        ):
+            etag = self.client.get(path, params)["ETag"]
+            response = self.call(view, path, params, HTTP_IF_NONE_MATCH = etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+
+
+    def test_categories(self):
+        self.assertSameResponse(
+            self.call(async_views.category_list, "/api/v1/food/categories/"), self.client.get("/api/v1/food/categories/")
+        )
+
+
+    def test_streaming_response_is_async_under_asgi(self):
+        response = streaming_response(AsyncRequestFactory().get("/"), iter(["[", "1", "]"]))
+        self.assertTrue(response.is_async)
+        self.assertFalse(streaming_response(RequestFactory().get("/"), iter(["[]"])).is_async)
+
+        async def read():
+            return b"".join([chunk async for chunk in response])
+        self.assertEqual(async_to_sync(read)(), b"[1]")
+
+
+
+class MenuVersionTestCase(TransactionTestCase):
+    """
+        Menu cache version is in database, so a change committed by another
+        process (worker, management command) is seen without its cache.
+        (real commits, signals bump the version after commit)
+    """
+    def setUp(self):
+        category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        self.product = Product.objects.create(
+            category = category, name = "Margherita", description = "description",
+            original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+        )
+
+
+    def get_names(self):
+        return [product["name"] for product in self.client.get("/api/v1/food/menu/").json()["results"]]
+
+
+    def test_version_from_other_process(self):
+        self.assertEqual(self.get_names(), ["Margherita"])
+        # ROW CHANGED WITHOUT SIGNALS -> CACHED MENU IS STILL SERVED
+        Product.objects.filter(pk = self.product.pk).update(name = "Funghi")
+        self.assertEqual(self.get_names(), ["Margherita"])
+
+        # OTHER PROCESS BUMPS VERSION, NOTHING IN THE CACHE OF THIS ONE IS TOUCHED
+        MenuVersion.objects.update(version = F("version") + 1)
+        self.assertEqual(self.get_names(), ["Funghi"])
+
+
+    def test_change_after_commit_bumps_version(self):
+        self.assertEqual(self.get_names(), ["Margherita"])
+        self.product.name = "Funghi"
+        self.product.save()
+        self.assertEqual(self.get_names(), ["Funghi"])
+
+
+
+class MenuCursorTestCase(TestCase):
+    """
+        /menu/ cursor pages: every product once, pages do not move when
+        products are added, previous gives the same page back
+    """
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        now = timezone.now()
+        for number in range(7):
+            product = Product.objects.create(
+                category = self.category, name = f"Pizza {number}", description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+            # SAME created_at FOR SOME, ORDER IS KEPT BY id
+            Product.objects.filter(pk = product.pk).update(created_at = now - timedelta(minutes = 10 - number // 2))
+
+
+    def get_page(self, url, **params):
+        data = self.client.get(url, params).json()
+        return [product["slug"] for product in data["results"]], data["next"], data["previous"]
+
+
+    def test_next_pages_have_every_product_once(self):
+        slugs, url = [], "/api/v1/food/menu/"
+        params = {"page_size": 3}
+        while url:
+            page, url, _ = self.get_page(url, **params)
+            slugs.extend(page)
+            params = {}
+        expected = list(Product.objects.order_by("created_at", "id").values_list("slug", flat = True))
+        self.assertEqual(slugs, expected)
+
+
+    def test_pages_are_stable(self):
+        first, next_url, _ = self.get_page("/api/v1/food/menu/", page_size = 3)
+        # NEW PRODUCT BEFORE ALL OTHERS, OFFSET PAGES WOULD MOVE BY ONE
+        product = Product.objects.create(
+            category = self.category, name = "Pizza old", description = "description",
+            original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+        )
+        Product.objects.filter(pk = product.pk).update(created_at = timezone.now() - timedelta(days = 1))
+
+        second, _, previous_url = self.get_page(next_url)
+        expected = list(Product.objects.exclude(pk = product.pk).order_by("created_at", "id").values_list("slug", flat = True))
+        self.assertEqual(second, expected[3:6])
+
+        previous, _, _ = self.get_page(previous_url)
+        self.assertEqual(previous, first)
+
+
+
+class GroupedMenuTestCase(TestCase):
+    """
+        /menu/grouped/: active categories with their active products in
+        3 queries, cached with ETag
+    """
+    def setUp(self):
+        cache.clear()
+        pizza = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        burger = Category.objects.create(name="Burger", image="category_images/burger.webp")
+        drinks = Category.objects.create(name="Drinks", image="category_images/drinks.webp", is_active = False)
+        Category.objects.create(name="Salads", image="category_images/salads.webp")
+        for category, name, is_active in (
+            (pizza, "Margherita", True), (pizza, "Diavola", False), (burger, "Cheeseburger", True),
+            (pizza, "Pepperoni", True), (drinks, "Cola", True),
+        ):
+            product = Product.objects.create(
+                category = category, name = name, description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = is_active,
+            )
+            product.ingredients.set(Ingredient.objects.resolve(["cheese"]))
+
+
+    def get_grouped(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/food/menu/grouped/", **headers)
+        # MENU VERSION IS READ TOO, ONLY QUERIES OF MENU COUNT
+        tables = ("product_category", "product_product", "product_ingredient")
+        return response, [query for query in queries if any(table in query["sql"] for table in tables)]
+
+
+    def test_nesting_and_inactive(self):
+        response, queries = self.get_grouped()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 3)
+        grouped = {category["name"]: [product["name"] for product in category["products"]] for category in response.json()}
+        self.assertEqual(grouped, {"Burger": ["Cheeseburger"], "Pizza": ["Margherita", "Pepperoni"], "Salads": []})
+        self.assertEqual([category["name"] for category in response.json()], ["Burger", "Pizza", "Salads"])
+
+        # PRODUCTS ARE THE SAME JSON AS IN /menu/
+        menu = self.client.get("/api/v1/food/menu/", {"category": "pizza"}).json()["results"]
+        self.assertEqual(response.json()[1]["products"], menu)
+
+
+    def test_queries_do_not_grow_with_categories(self):
+        for number in range(5):
+            category = Category.objects.create(name=f"Category {number}", image="category_images/pizza.webp")
+            Product.objects.create(
+                category = category, name = f"Product {number}", description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+        self.assertEqual(len(self.get_grouped()[1]), 3)
+
+
+    def test_etag_and_cache(self):
+        response = self.get_grouped()[0]
+        not_modified, queries = self.get_grouped(HTTP_IF_NONE_MATCH = response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(queries, [])
+
+        cached, queries = self.get_grouped()
+        self.assertEqual(queries, [])
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+
+
+class SparseFieldsetTestCase(TestCase):
+    """
+        ?fields= gives only asked fields, loads only their columns, skips
+        prefetch and is part of the menu cache key
+    """
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        for number in range(3):
+            product = Product.objects.create(
+                category = category, name = f"Pizza {number}", description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+            product.ingredients.set(Ingredient.objects.resolve(["cheese"]))
+
+
+    def get_menu(self, fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/food/menu/", {"fields": fields})
+        # MENU VERSION IS READ TOO, ONLY QUERIES OF PRODUCTS COUNT
+        return response, [query["sql"] for query in queries if "product_product" in query["sql"] or "product_ingredient" in query["sql"]]
+
+
+    def test_unknown_field(self):
+        for path in ("/api/v1/food/menu/", "/api/v1/food/categories/"):
+            response = self.client.get(path, {"fields": "name,password"})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("password", response.json()["fields"])
+
+
+    def test_only_asked_columns_without_prefetch(self):
+        response, queries = self.get_menu("name,slug")
+        self.assertEqual(set(response.json()["results"][0]), {"name", "slug"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("description", queries[0])
+        self.assertNotIn("product_category", queries[0])
+
+
+    def test_prefetch_only_for_ingredients(self):
+        response, queries = self.get_menu("name,ingredients")
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(response.json()["results"][0]["ingredients"], ["cheese"])
+
+        response, queries = self.get_menu("name,category")
+        self.assertEqual(len(queries), 1)
+        self.assertIn("product_category", queries[0])
+        self.assertEqual(response.json()["results"][0]["category"], "Pizza")
+
+
+    def test_fields_are_part_of_cache_key(self):
+        self.assertEqual(set(self.get_menu("name")[0].json()["results"][0]), {"name"})
+        response, queries = self.get_menu("slug")
+        self.assertEqual(set(response.json()["results"][0]), {"slug"})
+        self.assertEqual(len(queries), 1)
+
+        # SAME FIELDS AGAIN -> FROM CACHE
+        response, queries = self.get_menu("slug")
+        self.assertEqual(set(response.json()["results"][0]), {"slug"})
+        self.assertEqual(queries, [])
+
+
+
+class ProductSearchTestCase(TestCase):
+    """
+        ?search= with FTS5 index finds the same products as icontains
+        (database without full text index), for word prefixes
+    """
+    QUERIES = ("pizza", "PIZ", "chees", "mushroom", "burg", "lavash", "spicy", "cola", "nothing")
+
+    def setUp(self):
+        cache.clear()
+        products = (
+            ("Pizza", "Margherita", ["cheese", "tomato"]),
+            ("Pizza", "Pepperoni", ["cheese", "spicy sausage"]),
+            ("Pizza", "Funghi", ["mushroom"]),
+            ("Burger", "Cheeseburger", ["beef", "cheese"]),
+            ("Burger", "Chicken burger", ["chicken"]),
+            ("Lavash", "Spicy lavash", ["chicken", "pepper"]),
+            ("Drinks", "Cola", []),
+        )
+        # SEARCH INDEX IS WRITTEN AFTER COMMIT
+        with self.captureOnCommitCallbacks(execute = True):
+            for category_name, name, ingredients in products:
+                category, _ = Category.objects.get_or_create(name = category_name, defaults = {"image": "category_images/food.webp"})
+                product = Product.objects.create(
+                    category = category, name = name, description = "description",
+                    original_price = Decimal("10.00"), image = "product_images/food.webp", is_active = True,
+                )
+                product.ingredients.set(Ingredient.objects.resolve(ingredients))
+
+
+    def search(self, query):
+        response = self.client.get("/api/v1/food/menu/", {"search": query, "page_size": 100})
+        return sorted(product["slug"] for product in response.json()["results"])
+
+
+    def test_fts_and_icontains_find_same_products(self):
+        with_index = {query: self.search(query) for query in self.QUERIES}
+        cache.clear()
+        with mock.patch("backend.api.v1.viewsets.filters.search_product_ids", return_value = None):
+            without_index = {query: self.search(query) for query in self.QUERIES}
+        self.assertEqual(with_index, without_index)
+        self.assertEqual(with_index["chees"], ["cheeseburger", "margherita", "pepperoni"])
+        self.assertEqual(with_index["nothing"], [])
+
+
+
+class MenuChangesTestCase(TestCase):
+    """
+        /menu/changes/?since= gives products changed after token and slugs
+        of deleted (and renamed) ones
+    """
+    def setUp(self):
+        category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        self.products = {}
+        for name, ingredients in (("Margherita", ["cheese"]), ("Pepperoni", ["sausage"]), ("Funghi", ["mushroom"]), ("Hawaii", ["ham"])):
+            self.products[name] = Product.objects.create(
+                category = category, name = name, description = "description",
+                original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+            )
+            self.products[name].ingredients.set(Ingredient.objects.resolve(ingredients))
+        hour_ago = timezone.now() - timedelta(hours = 1)
+        Product.objects.update(created_at = hour_ago, updated_at = hour_ago)
+        Category.objects.update(updated_at = hour_ago)
+        self.since = make_sync_token(hour_ago + timedelta(minutes = 30))
+
+
+    def test_changes_since_token(self):
+        edited = self.products["Margherita"]
+        edited.description = "new description"
+        edited.save()
+        renamed = self.products["Pepperoni"]
+        renamed.name = "Diablo"
+        renamed.save()
+        deactivated = self.products["Hawaii"]
+        deactivated.is_active = False
+        deactivated.save()
+        self.products["Funghi"].delete()
+
+        data = self.client.get("/api/v1/food/menu/changes/", {"since": self.since}).json()
+        self.assertFalse(data["full"])
+        products = {product["slug"]: product for product in data["products"]}
+        self.assertEqual(set(products), {"margherita", "diablo", "hawaii"})
+        self.assertEqual(products["margherita"]["description"], "new description")
+        self.assertFalse(products["hawaii"]["is_active"])
+        self.assertEqual(sorted(data["deleted"]["products"]), ["funghi", "pepperoni"])
+        self.assertEqual(data["categories"], [])
+
+        # NEXT CALL WITH NEW TOKEN, NOTHING OLDER THAN OVERLAP
+        Product.objects.update(updated_at = timezone.now() - timedelta(hours = 1))
+        MenuTombstone.objects.update(deleted_at = timezone.now() - timedelta(hours = 1))
+        data = self.client.get("/api/v1/food/menu/changes/", {"since": data["token"]}).json()
+        self.assertEqual((data["products"], data["deleted"]["products"]), ([], []))
+
+
+    def get_changed_slugs(self):
+        data = self.client.get("/api/v1/food/menu/changes/", {"since": self.since}).json()
+        return sorted(product["slug"] for product in data["products"])
+
+
+    def test_ingredient_changes(self):
+        # RENAME OF INGREDIENT
+        cheese = Ingredient.objects.get(name = "cheese")
+        cheese.name = "mozzarella"
+        cheese.save()
+        self.assertEqual(self.get_changed_slugs(), ["margherita"])
+
+        # INGREDIENTS OF PRODUCT, BOTH SIDES OF M2M
+        self.products["Pepperoni"].ingredients.add(*Ingredient.objects.resolve(["basil"]))
+        Ingredient.objects.get(name = "ham").product_set.clear()
+        self.assertEqual(self.get_changed_slugs(), ["hawaii", "margherita", "pepperoni"])
+
+        # DELETE OF INGREDIENT
+        Ingredient.objects.get(name = "mushroom").delete()
+        data = self.client.get("/api/v1/food/menu/changes/", {"since": self.since}).json()
+        funghi = [product for product in data["products"] if product["slug"] == "funghi"]
+        self.assertEqual(funghi[0]["ingredients"], [])
+
+
+    def test_without_or_invalid_token(self):
+        data = self.client.get("/api/v1/food/menu/changes/").json()
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["products"]), 4)
+        self.assertEqual(self.client.get("/api/v1/food/menu/changes/", {"since": "abc"}).status_code, 400)
+
+
+
+class MediaTestCase(TestCase):
+    """
+        Temporary MEDIA_ROOT with real image files
+    """
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT = self.media_root, IMAGE_RESIZE_CACHE_DIR = os.path.join(self.media_root, "cache"))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # STATES OF FILES OF OTHER TESTS (SAME NAMES)
+        states = mock.patch.dict("backend.product.images._image_states", clear = True)
+        states.start()
+        self.addCleanup(states.stop)
+        self.category = Category.objects.create(name="Lavash", image="category_images/lavash.webp")
+
+
+    def save_image(self, name, size=(1000, 800)):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        Image.new("RGB", size, "red").save(path)
+        return name
+
+
+    def create_product(self, name, image):
+        return Product.objects.create(
+            category = self.category, name = name, description = "description",
+            original_price = Decimal("10.00"), image = image, is_active = True,
+        )
+
+
+
+class ImageVariantsTestCase(MediaTestCase):
+    """
+        thumb/card/full variants are made by the task, json has urls of
+        variants only when their files exist (else url of original)
+    """
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product("Lavash", self.save_image("product_images/lavash.png"))
+
+
+    def get_variants(self):
+        request = RequestFactory().get("/")
+        return ProductReadSerializer(Product.objects.all(), many = True, context = {"request": request}).data[0]["image_variants"]
+
+
+    def test_make_image_variants(self):
+        made = make_image_variants("product_images/lavash.png")
+        self.assertEqual(made, [get_variant_name("product_images/lavash.png", variant) for variant in ("thumb", "card", "full")])
+        sizes = [Image.open(os.path.join(self.media_root, name)).size for name in made]
+        # NEVER BIGGER THAN ORIGINAL
+        self.assertEqual(sizes, [(320, 256), (800, 640), (1000, 800)])
+        self.assertEqual(make_image_variants("product_images/lavash.png"), [])
+        self.assertEqual(make_image_variants("product_images/missing.png"), [])
+
+
+    def test_variants_are_given_only_when_made(self):
+        original = "http://testserver/media/product_images/lavash.png"
+        variants = self.get_variants()
+        self.assertEqual([variants[variant] for variant in ("thumb", "card", "full")], [original] * 3)
+
+        with mock.patch("backend.product.signals.schedule_menu_rebuild") as schedule_menu_rebuild:
+            make_image_variants("product_images/lavash.png")
+        # MENU OF THE CATEGORY IS REBUILT WITH NEW URLS
+        schedule_menu_rebuild.assert_called_once_with(categories = {self.category.id})
+        variants = self.get_variants()
+        self.assertEqual(variants["thumb"], "http://testserver/media/product_images/variants/lavash.thumb.webp")
+        self.assertEqual(variants["full"], "http://testserver/media/product_images/variants/lavash.full.webp")
+
+
+    @override_settings(TASKS_RUN_EAGER=False)
+    def test_upload_enqueues_task(self):
+        upload = io.BytesIO()
+        Image.new("RGB", (100, 100), "blue").save(upload, "PNG")
+        self.product.image = SimpleUploadedFile("new.png", upload.getvalue(), content_type = "image/png")
+        self.product.save()
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.args), ("backend.product.images.make_image_variants", [self.product.image.name]))
+
+        # PRICE CHANGE, NO NEW UPLOAD -> NO TASK
+        self.product.original_price = Decimal("12.00")
+        self.product.save()
+        self.assertEqual(Task.objects.count(), 1)
+
+
+
+class ResizedImageUrlTestCase(MediaTestCase):
+    """
+        image_variants has signed url of every IMAGE_RESIZE_SIZES and it works
+    """
+    def setUp(self):
+        super().setUp()
+        self.create_product("Lavash", self.save_image("product_images/lavash.png"))
+        self.create_product("Burger", "product_images/missing.png")
+
+
+    def test_sizes_are_signed_urls(self):
+        response = self.client.get("/api/v1/food/menu/")
+        products = {product["image"].rsplit("/", 1)[-1]: product for product in response.json()["results"]}
+        sizes = products["lavash.png"]["image_variants"]["sizes"]
+        self.assertEqual(list(sizes), ["160x160", "320x320", "480x360", "640x480", "800x600", "1280x720"])
+        self.assertTrue(sizes["640x480"].startswith("http://testserver/media/resize/640x480/product_images/lavash.png?"))
+
+        response = self.client.get(sizes["640x480"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(Image.open(io.BytesIO(b"".join(response.streaming_content))).size, (600, 480))
+        self.assertEqual(self.client.get(sizes["640x480"].replace("s=", "s=0")).status_code, 403)
+
+        # NO FILE -> NO SIZES
+        self.assertEqual(products["missing.png"]["image_variants"]["sizes"], {})
+
+
+    def test_signature_size_and_source_are_checked(self):
+        url = get_resized_image_url("product_images/lavash.png", 320, 320)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # OTHER SIZE OR VERSION WITH THE SAME SIGNATURE
+        self.assertEqual(self.client.get(url.replace("320x320", "160x160")).status_code, 403)
+        self.assertEqual(self.client.get(url.replace("?v=", "?v=1")).status_code, 403)
+        self.assertEqual(self.client.get(url.split("&s=")[0]).status_code, 403)
+
+        # ONLY IMAGE_RESIZE_SIZES, ALSO WITH VALID SIGNATURE
+        with self.assertRaises(ValueError):
+            get_resized_image_url("product_images/lavash.png", 321, 320)
+        signature = get_resize_signature(321, 320, "product_images/lavash.png", "")
+        self.assertEqual(self.client.get(f"/media/resize/321x320/product_images/lavash.png?s={signature}").status_code, 403)
+
+        # ONLY FILES OF IMAGE_RESIZE_DIRS, NO ../
+        self.save_image("qr_codes/secret.png")
+        for name in ("qr_codes/secret.png", "product_images/../qr_codes/secret.png"):
+            self.assertEqual(get_resized_image_urls(name), {})
+            signature = get_resize_signature(320, 320, name, "")
+            self.assertEqual(self.client.get(f"/media/resize/320x320/{name}?s={signature}").status_code, 404)
+
+
+    def test_urls_are_signed_once_per_version(self):
+        request = RequestFactory().get("/")
+        ProductReadSerializer(Product.objects.all(), many = True, context = {"request": request}).data
+        with mock.patch("backend.product.resize.get_resize_signature") as get_resize_signature, \
+                mock.patch("os.stat") as stat:
+            ProductReadSerializer(Product.objects.all(), many = True, context = {"request": request}).data
+        get_resize_signature.assert_not_called()
+        stat.assert_not_called()
+
+
+    def test_least_recently_used_are_evicted(self):
+        names = [self.save_image(f"product_images/{number}.png", (100, 100)) for number in range(3)]
+        with mock.patch("backend.product.resize._cache_bytes", None):
+            paths = [get_resized_image(160, 160, name) for name in names[:2]]
+            size = os.path.getsize(paths[0])
+            old = time.time() - 100
+            os.utime(paths[0], (old, old))
+            # THIRD IS OVER THE LIMIT, OLDEST IS REMOVED UNTIL 90% OF IT
+            with override_settings(IMAGE_RESIZE_CACHE_MAX_BYTES = int(size * 2 / 0.9) + 1):
+                paths.append(get_resized_image(160, 160, names[2]))
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, True])
+
+
+    def test_snapshot_has_same_sizes(self):
+        snapshot = self.client.get("/api/v1/food/menu/", {"all": 1}).json()
+        paged = self.client.get("/api/v1/food/menu/", {"page_size": 100}).json()["results"]
+        self.assertEqual(snapshot, paged)
+
+
+
+class PublicFastPathTestCase(TestCase):
+    """
+        Fast path gives the same response as the whole MIDDLEWARE and still
+        checks ALLOWED_HOSTS
+    """
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Pizza", image="category_images/pizza.webp")
+        Product.objects.create(
+            category = category, name = "Pizza", description = "description",
+            original_price = Decimal("10.00"), image = "product_images/pizza.webp", is_active = True,
+        )
+
+
+    def get_both(self, path, **headers):
+        with mock.patch("backend.api.v1.viewsets.middleware.get_public_match") as get_public_match:
+            get_public_match.return_value = None
+            normal = self.client.get(path, **headers)
+        fast = self.client.get(path, **headers)
+        return normal, fast
+
+
+    def test_same_response_as_normal_path(self):
+        for path in ("/api/v1/food/menu/", "/api/v1/food/menu/?all=1", "/api/v1/food/categories/", "/api/v1/food/menu/?category=burger"):
+            normal, fast = self.get_both(path, HTTP_ACCEPT_ENCODING = "gzip")
+            self.assertIsNotNone(fast.wsgi_request.resolver_match)
+            self.assertEqual(fast.status_code, normal.status_code)
+            self.assertEqual(fast.content, normal.content)
+            self.assertEqual(dict(fast.headers), dict(normal.headers))
+            self.assertIn("X-Frame-Options", fast.headers)
+
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_allowed_hosts(self):
+        normal, fast = self.get_both("/api/v1/food/menu/", HTTP_HOST = "evil.example.com")
+        self.assertEqual(normal.status_code, 400)
+        self.assertEqual(fast.status_code, 400)
+
+
+    @override_settings(DISALLOWED_USER_AGENTS=[re.compile("bot")])
+    def test_disallowed_user_agents(self):
+        self.assertEqual(self.client.get("/api/v1/food/menu/", HTTP_USER_AGENT = "bot").status_code, 403)
+
+
+
+class CompressionCacheTestCase(TestCase):
+    """
+        Cached compressed body belongs to the bytes, not to the ETag. Only
+        public responses are cached or brotli (BREACH)
+    """
+    body = json.dumps([{"name": "a" * 300}]).encode()
+
+    def compress(self, encoding, **headers):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=encoding)
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body, content_type="application/json", headers=headers))
+        return middleware(request)
+
+
+    def test_public_response_is_cached(self):
+        with mock.patch("backend.api.v1.viewsets.middleware.cache") as compression_cache:
+            compression_cache.get.return_value = None
+            response = self.compress("br", ETag='"menu"')
+        self.assertEqual(response["Content-Encoding"], "br")
+        compression_cache.set.assert_called_once()
+
+
+    def test_not_public_response_has_random_bytes(self):
+        for headers in ({}, {"ETag": '"me"', "Cache-Control": "private"}, {"ETag": '"me"', "Cache-Control": "no-store"}):
+            with mock.patch("backend.api.v1.viewsets.middleware.cache") as compression_cache:
+                responses = [self.compress("br, gzip", **headers) for _ in range(5)]
+            compression_cache.get.assert_not_called()
+            compression_cache.set.assert_not_called()
+            for response in responses:
+                self.assertEqual(response["Content-Encoding"], "gzip")
+                self.assertEqual(gzip.decompress(response.content), self.body)
+            # RANDOM FILE NAME IN GZIP HEADER -> NOT THE SAME BYTES EVERY TIME
+            self.assertGreater(len({response.content for response in responses}), 1)
+
+        # ONLY br ACCEPTED -> NOT COMPRESSED
+        self.assertFalse(self.compress("br").has_header("Content-Encoding"))
+
+    def test_same_etag_other_bytes_of_same_length(self):
+        request = RequestFactory().get("/api/v1/food/categories/", HTTP_ACCEPT_ENCODING="gzip")
+        bodies = [json.dumps([{"name": letter * 300}]).encode() for letter in "ab"]
+        for body in bodies:
+            middleware = CompressionMiddleware(lambda request: HttpResponse(body, content_type="application/json", headers={"ETag": '"same"'}))
+            response = middleware(request)
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(response.content), body)
@@ -1,3 +1,32 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseForbidden
+
+from .resize import (check_resize_signature, get_resized_image,
+                     get_source_version, is_allowed_source)
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def resize_image(request, width, height, name):
+    """
+        /media/resize/<w>x<h>/<path>?v=...&s=... (see get_resized_image_url)
+        Image is resized on first request and then served from disk cache.
+    """
+    version = request.GET.get("v", "")
+    if f"{width}x{height}" not in settings.IMAGE_RESIZE_SIZES:
+        return HttpResponseForbidden("Size is not allowed.")
+    if not check_resize_signature(width, height, name, version, request.GET.get("s")):
+        return HttpResponseForbidden("Invalid signature.")
+    if not is_allowed_source(name) or not os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+        raise Http404("Image not found.")
+
+    response = FileResponse(open(get_resized_image(width, height, name), "rb"), content_type = "image/webp")
+    if version == get_source_version(name):
+        # URL HAS VERSION OF ORIGINAL, NEW UPLOAD -> NEW URL
+        response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        # OLD URL, ORIGINAL WAS CHANGED AFTER IT
+        response["Cache-Control"] = "public, max-age=60"
+    return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Address, Feedback, Media, Restaurant
+from .models import Address, Feedback, Media, RatingSummary, Restaurant
 
 # Register your models here.
 
@@ -8,4 +8,5 @@ from .models import Address, Feedback, Media, Restaurant
 admin.site.register(Restaurant)
 admin.site.register(Address)
 admin.site.register(Media)
-admin.site.register(Feedback)
\ No newline at end of file
+admin.site.register(Feedback)
+admin.site.register(RatingSummary)
\ No newline at end of file
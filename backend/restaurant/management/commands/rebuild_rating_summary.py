@@ -0,0 +1,28 @@
+from backend.restaurant.models import (RATING_STEPS, Feedback, RatingSummary,
+                                       Restaurant, get_rating_field)
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+
+class Command(BaseCommand):
+    help = "Rebuild rating summary (count, sum, histogram) of every restaurant from feedbacks"
+
+    def handle(self, *args, **options):
+        buckets = {get_rating_field(step): Count("id", filter = Q(rating = step)) for step in RATING_STEPS}
+        with transaction.atomic():
+            # LOCK SUMMARIES, FEEDBACKS SAVED MEANWHILE WAIT FOR THE NEW NUMBERS
+            list(RatingSummary.objects.select_for_update())
+            rows = {
+                row.pop("restaurant_id"): row
+                for row in Feedback.objects.values("restaurant_id").annotate(count = Count("id"), total = Sum("rating"), **buckets)
+            }
+            fixed = 0
+            for restaurant_id in Restaurant.objects.values_list("id", flat = True):
+                values = rows.get(restaurant_id) or {"count": 0, "total": 0, **{field: 0 for field in buckets}}
+                values["total"] = values["total"] or 0
+                summary, created = RatingSummary.objects.get_or_create(restaurant_id = restaurant_id, defaults = values)
+                if created or any(getattr(summary, field) != value for field, value in values.items()):
+                    RatingSummary.objects.filter(id = summary.id).update(**values)
+                    fixed += 1
+        self.stdout.write(self.style.SUCCESS(f"Rating summary rebuilt, {fixed} restaurants changed."))
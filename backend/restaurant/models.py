@@ -3,12 +3,11 @@ import os
 from backend.account.validators import validate_uzb_phone_number
 from backend.product.utils import get_slugify
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import models
-from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
-from django_resized import ResizedImageField
 
-from .utils import generate_qr_code
+from .utils import get_qr_code_name, render_qr_code
 from .validators import validate_rating
 
 # Create your models here.
@@ -98,15 +97,17 @@ class Restaurant(models.Model):
 
     def save(self, *args, **kwargs):
         self.slug = get_slugify(self.name)
-        sanitized_name = slugify(self.domain_name)
-        fname = f'qr_code-{sanitized_name}.png'
+        # QR CODE IS MADE ONLY IF DOMAIN (OR LOGO) IS CHANGED, ELSE THE SAME FILE.
+        # NEW ONE IS MADE BY WORKER AFTER COMMIT, qr_code IS EMPTY UNTIL THE
+        # WORKER HAS WRITTEN THE FILE (NO URL OF A MISSING FILE), ONE TASK
+        # FOR ALL SAVES UNTIL THEN
         logo_path = os.path.join(settings.MEDIA_ROOT, 'qr_codes/logo.jpg')
-        qr_code_img = generate_qr_code(self.domain_name, logo_path=logo_path)
-
-        qr_code_file = os.path.join(settings.MEDIA_ROOT, 'qr_codes', fname)
-        qr_code_img.save(qr_code_file, 'PNG')
-        self.qr_code = os.path.join('qr_codes', fname)
+        qr_code_name = get_qr_code_name(self.domain_name, logo_path=logo_path)
+        is_rendered = default_storage.exists(qr_code_name)
+        self.qr_code = qr_code_name if is_rendered else None
         super().save(*args, **kwargs)
+        if not is_rendered:
+            render_qr_code.enqueue_once(self.pk, self.domain_name, logo_path)
 # END Restaurant TABLE
 
 
@@ -165,7 +166,7 @@ class Media(models.Model):
         on_delete=models.CASCADE,
         related_name=("restaurant_images"),
     )
-    image = ResizedImageField(
+    image = models.ImageField(
         _("restaurant image"),
         upload_to = "restaurant_images/",
         blank = True,
@@ -244,8 +245,91 @@ class Feedback(models.Model):
     class Meta:
         verbose_name = _("Feedback")
         verbose_name_plural = _("Restaurant feedbacks")
+        indexes = [
+            # REVIEW FEED: NEWEST FIRST (KEYSET) AND DATE WINDOW
+            models.Index(fields=["created_at"], name="feedback_created_at_idx"),
+            # RATING RANGE + DATE WINDOW
+            models.Index(fields=["rating", "created_at"], name="feedback_rating_created_idx"),
+        ]
+
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # REMEMBER LOADED RATING, IF IT WILL BE CHANGED RATING SUMMARY MOVES IT TO NEW BUCKET
+        instance._loaded_rating = instance.__dict__.get("rating")
+        instance._loaded_restaurant_id = instance.__dict__.get("restaurant_id")
+        return instance
 
     
     def __str__(self):
         return str(self.rating)
-# END REVIEW RATING TABLE
\ No newline at end of file
+# END REVIEW RATING TABLE
+
+
+# RATING SUMMARY TABLE
+RATING_STEPS = (0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5)
+
+
+def get_rating_field(rating):
+    """
+        Misali:
+            0.5 -> rating_05, 4 -> rating_40
+    """
+    return f"rating_{int(round(float(rating) * 10)):02d}"
+
+
+
+class RatingSummary(models.Model):
+    """
+        Count, sum and histogram of feedback ratings of restaurant, changed
+        with F() by every feedback save/delete (see signals), so average
+        rating is never counted over all feedbacks.
+        Rebuilt from scratch: manage.py rebuild_rating_summary
+    """
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="rating_summary"
+    )
+    count = models.PositiveIntegerField(_("count of ratings"), default=0)
+    total = models.FloatField(_("sum of ratings"), default=0)
+    rating_05 = models.PositiveIntegerField(default=0)
+    rating_10 = models.PositiveIntegerField(default=0)
+    rating_15 = models.PositiveIntegerField(default=0)
+    rating_20 = models.PositiveIntegerField(default=0)
+    rating_25 = models.PositiveIntegerField(default=0)
+    rating_30 = models.PositiveIntegerField(default=0)
+    rating_35 = models.PositiveIntegerField(default=0)
+    rating_40 = models.PositiveIntegerField(default=0)
+    rating_45 = models.PositiveIntegerField(default=0)
+    rating_50 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(
+        auto_now= True,
+        verbose_name=_("date rating summary last updated"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
+
+    class Meta:
+        verbose_name = _("rating summary")
+        verbose_name_plural = _("rating summaries")
+
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.average} ({self.count})"
+
+
+    @property
+    def average(self):
+        if not self.count:
+            return None
+        return round(self.total / self.count, 2)
+
+
+    @property
+    def histogram(self):
+        """
+            {"0.5": 3, "1.0": 0, ... "5.0": 120}
+        """
+        return {f"{float(step):.1f}": getattr(self, get_rating_field(step)) for step in RATING_STEPS}
+# END RATING SUMMARY TABLE
\ No newline at end of file
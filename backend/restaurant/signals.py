@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Feedback, RatingSummary, get_rating_field
+
+
+def change_rating_summary(restaurant_id, rating, sign):
+    """
+        sign = 1 -> rating added, sign = -1 -> rating removed.
+        One UPDATE with F(), concurrent feedbacks do not lose each other.
+        Summary is created by the first added rating.
+    """
+    field = get_rating_field(rating)
+    changes = {
+        "count": F("count") + sign,
+        "total": F("total") + sign * float(rating),
+        field: F(field) + sign,
+    }
+    updated = RatingSummary.objects.filter(restaurant_id = restaurant_id).update(**changes)
+    if not updated and sign > 0:
+        # FIRST FEEDBACK OF RESTAURANT
+        RatingSummary.objects.get_or_create(restaurant_id = restaurant_id)
+        RatingSummary.objects.filter(restaurant_id = restaurant_id).update(**changes)
+
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        get_user_model().objects.filter(pk = instance.customer_id, has_feedback = False).update(has_feedback = True)
+    else:
+        old_rating = getattr(instance, "_loaded_rating", None)
+        old_restaurant_id = getattr(instance, "_loaded_restaurant_id", None)
+        # NOT LOADED FROM DB -> OLD RATING IS NOT KNOWN, rebuild_rating_summary FIXES IT
+        if old_rating is None or (old_rating == instance.rating and old_restaurant_id == instance.restaurant_id):
+            return
+        change_rating_summary(old_restaurant_id, old_rating, -1)
+    change_rating_summary(instance.restaurant_id, instance.rating, 1)
+    instance._loaded_rating = instance.rating
+    instance._loaded_restaurant_id = instance.restaurant_id
+
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    rating = getattr(instance, "_loaded_rating", instance.rating)
+    restaurant_id = getattr(instance, "_loaded_restaurant_id", instance.restaurant_id)
+    change_rating_summary(restaurant_id, rating, -1)
+    # LAST FEEDBACK OF USER IS REMOVED
+    if not Feedback.objects.filter(customer_id = instance.customer_id).exists():
+        get_user_model().objects.filter(pk = instance.customer_id, has_feedback = True).update(has_feedback = False)
@@ -1,3 +1,179 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from backend.account.models import UserBase
+from backend.restaurant.models import Feedback, RatingSummary, Restaurant
+from backend.tasks.models import Task
+from backend.tasks.queue import claim_tasks, run_task
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
 
 # Create your tests here.
+
+
+# FAST HASHER, TESTS CREATE MANY CUSTOMERS
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RestaurantTestCase(TestCase):
+    """
+        Restaurant, admin and customers for feedback tests
+    """
+    def setUp(self):
+        self.restaurant = Restaurant.objects.bulk_create([
+            Restaurant(name="Foodify", slug="foodify", about_us="about", phone_number1="+998901234567", domain_name="foodify.uz")
+        ])[0]
+        self.admin = UserBase.objects.create_superuser("+998900000000", "pass1234")
+
+
+    def create_feedback(self, number, rating, days_ago=0):
+        customer = UserBase.objects.create_user(f"+99891000{number:04d}", "pass1234", is_active = True)
+        feedback = Feedback.objects.create(restaurant = self.restaurant, customer = customer, rating = rating, feedback = "text")
+        if days_ago:
+            Feedback.objects.filter(pk = feedback.pk).update(created_at = timezone.now() - timedelta(days = days_ago))
+        return feedback
+
+
+
+class RatingSummaryTestCase(RestaurantTestCase):
+    """
+        RatingSummary follows create, update and delete of feedbacks and
+        is the same as rebuilt from scratch
+    """
+    def get_summary(self):
+        summary = RatingSummary.objects.get(restaurant = self.restaurant)
+        histogram = {rating: count for rating, count in summary.histogram.items() if count}
+        return summary.count, summary.average, histogram
+
+
+    def assertSameAsRebuilt(self, expected):
+        self.assertEqual(self.get_summary(), expected)
+        call_command("rebuild_rating_summary", stdout = io.StringIO())
+        self.assertEqual(self.get_summary(), expected)
+
+
+    def test_create_update_delete(self):
+        first = self.create_feedback(1, 5.0)
+        second = self.create_feedback(2, 4.0)
+        third = self.create_feedback(3, 3.5)
+        self.assertSameAsRebuilt((3, 4.17, {"3.5": 1, "4.0": 1, "5.0": 1}))
+
+        # OBJECT RETURNED BY create() AND OBJECT LOADED FROM DB
+        third.rating = 1.0
+        third.save()
+        second = Feedback.objects.get(pk = second.pk)
+        second.rating = 4.5
+        second.save()
+        self.assertSameAsRebuilt((3, 3.5, {"1.0": 1, "4.5": 1, "5.0": 1}))
+
+        # SAVE WITHOUT CHANGE OF RATING
+        second.feedback = "other text"
+        second.save()
+        self.assertSameAsRebuilt((3, 3.5, {"1.0": 1, "4.5": 1, "5.0": 1}))
+
+        first.delete()
+        Feedback.objects.get(pk = third.pk).delete()
+        self.assertSameAsRebuilt((1, 4.5, {"4.5": 1}))
+
+        second.delete()
+        self.assertSameAsRebuilt((0, None, {}))
+
+
+
+class ReviewFeedTestCase(RestaurantTestCase):
+    """
+        Admin review feed: streamed list in the same order as pages
+    """
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        for number in range(5):
+            self.create_feedback(number, 5.0, days_ago = number % 3)
+
+
+    def test_stream_has_order_of_pages(self):
+        paged = self.client.get("/api/v1/foood/admindashboard/reviews/", {"page_size": 100}).json()["results"]
+        streamed = b"".join(self.client.get("/api/v1/foood/admindashboard/reviews/", {"stream": 1}).streaming_content)
+        self.assertEqual(paged, json.loads(streamed))
+
+
+
+class ReviewFilterTestCase(RestaurantTestCase):
+    """
+        ?rating, rating_min, rating_max, created_after, created_before of
+        admin review list (paged and streamed)
+    """
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        for number, (rating, days_ago) in enumerate(((1.0, 10), (2.5, 8), (4.0, 5), (4.5, 3), (5.0, 1))):
+            feedback = self.create_feedback(number, rating, days_ago = days_ago)
+            Feedback.objects.filter(pk = feedback.pk).update(feedback = f"review {rating}")
+
+
+    def get_reviews(self, **params):
+        response = self.client.get("/api/v1/foood/admindashboard/reviews/", params)
+        self.assertEqual(response.status_code, 200)
+        return [review["feedback"] for review in response.json()["results"]]
+
+
+    def test_filters(self):
+        four_days_ago = (timezone.now() - timedelta(days = 4)).isoformat()
+        self.assertEqual(self.get_reviews(rating = 4.5), ["review 4.5"])
+        self.assertEqual(self.get_reviews(rating_min = 4), ["review 5.0", "review 4.5", "review 4.0"])
+        self.assertEqual(self.get_reviews(rating_max = 2.5), ["review 2.5", "review 1.0"])
+        self.assertEqual(self.get_reviews(rating_min = 2, rating_max = 4.5), ["review 4.5", "review 4.0", "review 2.5"])
+        self.assertEqual(self.get_reviews(created_after = four_days_ago), ["review 5.0", "review 4.5"])
+        self.assertEqual(self.get_reviews(created_before = four_days_ago), ["review 4.0", "review 2.5", "review 1.0"])
+        self.assertEqual(self.get_reviews(rating_max = 4, created_before = four_days_ago), ["review 4.0", "review 2.5", "review 1.0"])
+        self.assertEqual(self.get_reviews(rating_min = 3, created_before = four_days_ago), ["review 4.0"])
+
+
+    def test_filters_of_stream_and_invalid_values(self):
+        streamed = b"".join(self.client.get("/api/v1/foood/admindashboard/reviews/", {"stream": 1, "rating_min": 4.5}).streaming_content)
+        self.assertEqual([review["feedback"] for review in json.loads(streamed)], ["review 5.0", "review 4.5"])
+        response = self.client.get("/api/v1/foood/admindashboard/reviews/", {"rating_min": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+
+
+@override_settings(TASKS_RUN_EAGER=False)
+class QrCodeTestCase(TestCase):
+    """
+        qr_code is empty until the worker has written the file
+    """
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT = media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(os.path.join(media_root, "qr_codes"))
+        Image.new("RGB", (200, 200), "white").save(os.path.join(media_root, "qr_codes", "logo.jpg"))
+
+
+    def test_qr_code_is_set_by_worker(self):
+        restaurant = Restaurant(name="Foodify", about_us="about", phone_number1="+998901234567", domain_name="foodify.uz")
+        restaurant.save()
+        # SAVES BEFORE THE WORKER HAS RUN -> STILL ONE TASK
+        restaurant.save()
+        Restaurant.objects.get().save()
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertFalse(Restaurant.objects.get().qr_code)
+        self.assertIsNone(self.client.get("/api/v1/restaurant/").json()["restaurant"]["qr_code"])
+
+        for task in claim_tasks(10):
+            self.assertTrue(run_task(task))
+        restaurant = Restaurant.objects.get()
+        self.assertTrue(default_storage.exists(restaurant.qr_code.name))
+        self.assertTrue(self.client.get("/api/v1/restaurant/").json()["restaurant"]["qr_code"].endswith(restaurant.qr_code.name))
+
+        # FILE IS THERE -> SET AT ONCE, NO NEW TASK
+        restaurant.save()
+        self.assertEqual(Restaurant.objects.get().qr_code.name, restaurant.qr_code.name)
+        self.assertFalse(Task.objects.exists())
@@ -1,20 +1,85 @@
+import base64
+import hashlib
+import io
+import os
+from functools import lru_cache
+
 import qrcode
+from backend.tasks.media import delete_media_files
+from backend.tasks.queue import task
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
 from PIL import Image
 
+QR_COLOR = (3, 58, 78)
+QR_LOGO_WIDTH = 100
+QR_BOX_SIZE = 10
+
+
+@lru_cache(maxsize=8)
+def _get_file_digest(path, mtime_ns, size):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
 
-def generate_qr_code(url, logo_path, qr_color=(3, 58, 78)):
+def get_file_digest(path):
     """
-    Generate QR code with a logo.
+        sha256 of file, read again only if file is changed (mtime, size)
     """
+    stat = os.stat(path)
+    return _get_file_digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+
+@lru_cache(maxsize=8)
+def _get_logo(logo_path, digest):
     logo = Image.open(logo_path)
-    basewidth = 100
-    wpercent = (basewidth / float(logo.size[0]))
+    wpercent = (QR_LOGO_WIDTH / float(logo.size[0]))
     hsize = int((float(logo.size[1]) * float(wpercent)))
-    logo = logo.resize((basewidth, hsize), Image.LANCZOS)
+    return logo.resize((QR_LOGO_WIDTH, hsize), Image.LANCZOS)
 
-    qr_code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H)
+
+def get_logo(logo_path):
+    """
+        Resized logo, kept in memory while the logo file is the same
+    """
+    return _get_logo(logo_path, get_file_digest(logo_path))
+
+
+
+def get_qr_code_name(url, logo_path, qr_color=QR_COLOR):
+    """
+        Name of qr code is made from everything in the image (url, color,
+        logo), so the same inputs -> the same file and it is not made again.
+        Misali:
+            qr_codes/qr_code-foodify-uz-1a2b3c4d5e6f.png
+    """
+    key = f"{url}|{qr_color}|{get_file_digest(logo_path)}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:12]
+    return f"qr_codes/qr_code-{slugify(url)}-{digest}.png"
+
+
+
+def get_svg_name(name):
+    return os.path.splitext(str(name))[0] + ".svg"
+
+
+
+def make_qr_code(url):
+    qr_code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, box_size=QR_BOX_SIZE)
     qr_code.add_data(url)
     qr_code.make()
+    return qr_code
+
+
+
+def generate_qr_code(url, logo_path, qr_color=QR_COLOR):
+    """
+    Generate QR code with a logo.
+    """
+    logo = get_logo(logo_path)
+    qr_code = make_qr_code(url)
 
     qr_image = qr_code.make_image(fill_color=qr_color, back_color="white").convert('RGB')
 
@@ -23,6 +88,103 @@ def generate_qr_code(url, logo_path, qr_color=(3, 58, 78)):
 
     return qr_image
 
+
+
+def generate_qr_code_svg(url, logo_path, qr_color=QR_COLOR):
+    """
+        Same qr code as svg: one path of dark modules (row by row) and the
+        logo in the middle, a few KB instead of a big PNG.
+    """
+    matrix = make_qr_code(url).get_matrix()
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    logo = get_logo(logo_path)
+    buffer = io.BytesIO()
+    logo.convert("RGB").save(buffer, "JPEG", quality=80)
+    logo_data = base64.b64encode(buffer.getvalue()).decode()
+    # LOGO HAS THE SAME SIZE (IN MODULES) AS IN PNG
+    width = logo.size[0] / QR_BOX_SIZE
+    height = logo.size[1] / QR_BOX_SIZE
+    # PNG PASTES LOGO AT WHOLE PIXELS
+    left = (size * QR_BOX_SIZE - logo.size[0]) // 2 / QR_BOX_SIZE
+    top = (size * QR_BOX_SIZE - logo.size[1]) // 2 / QR_BOX_SIZE
+    color = "#%02x%02x%02x" % tuple(qr_color)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="{color}" d="{"".join(path)}"/>'
+        f'<image x="{left:g}" y="{top:g}" width="{width:g}" height="{height:g}" href="data:image/jpeg;base64,{logo_data}"/>'
+        f'</svg>'
+    )
+
+
+
+def save_qr_code(url, logo_path, qr_color=QR_COLOR):
+    """
+        Saves PNG and SVG of qr code if they are not there yet.
+        return name of PNG
+    """
+    name = get_qr_code_name(url, logo_path, qr_color)
+    if not default_storage.exists(name):
+        buffer = io.BytesIO()
+        generate_qr_code(url, logo_path, qr_color).save(buffer, "PNG")
+        write_file(name, buffer.getvalue())
+    svg_name = get_svg_name(name)
+    if not default_storage.exists(svg_name):
+        write_file(svg_name, generate_qr_code_svg(url, logo_path, qr_color).encode())
+    return name
+
+
+
+def write_file(name, content):
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+
+@task
+def render_qr_code(restaurant_id, url, logo_path):
+    """
+        Writes the files, then sets qr_code of restaurant (if its domain is
+        still url, else a newer render_qr_code sets it)
+    """
+    name = save_qr_code(url, logo_path)
+    Restaurant = apps.get_model("restaurant", "Restaurant")
+    Restaurant.objects.filter(pk = restaurant_id, domain_name = url).update(qr_code = name)
+
+
+
+def get_qr_code_file_names(name):
+    """
+        PNG and SVG of qr code, for removing from media
+    """
+    if not name:
+        return []
+    return [str(name), get_svg_name(name)]
+
+
+
+def delete_qr_code(name):
+    """
+        Removes PNG and SVG of qr code from media (by worker, after commit)
+    """
+    names = get_qr_code_file_names(name)
+    if names:
+        delete_media_files.enqueue(names)
+
 # def generate_qr_code(url, logo_path, qr_color=(3, 58, 78)):
 #     """
 #         Generated qr code ok :)
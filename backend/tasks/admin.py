@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Task
+
+# Register your models here.
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "created_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "updated_at")
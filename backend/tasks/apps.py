@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "backend.tasks"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from config.database import set_sqlite_pragmas
+
+        # WORKERS AND REQUESTS WRITE TO ONE DB (SQLITE -> WAL, busy_timeout)
+        connection_created.connect(set_sqlite_pragmas, dispatch_uid="set_sqlite_pragmas")
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.tasks.queue import claim_tasks, requeue_stale_tasks, run_task
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+def run_in_thread(task):
+    try:
+        return run_task(task)
+    finally:
+        # EVERY THREAD HAS ITS OWN CONNECTION, DJANGO DOES NOT CLOSE THEM HERE
+        connection.close()
+
+
+
+class Command(BaseCommand):
+    help = "Worker of the task queue: runs pending tasks with retries (one process, many threads)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.TASK_CONCURRENCY, help="Tasks run at the same time")
+        parser.add_argument("--once", action="store_true", help="Run all due tasks and exit (cron, tests)")
+
+
+    def handle(self, *args, **options):
+        concurrency = max(options["concurrency"], 1)
+        once = options["once"]
+        done = failed = 0
+        running = set()
+        last_requeue = 0
+
+        self.stdout.write(f"Task worker started, concurrency {concurrency}.")
+        with ThreadPoolExecutor(max_workers = concurrency, thread_name_prefix = "task") as executor:
+            try:
+                while True:
+                    if time.monotonic() - last_requeue > settings.TASK_LOCK_TIMEOUT / 2:
+                        requeued = requeue_stale_tasks()
+                        if requeued:
+                            self.stdout.write(f"{requeued} stale tasks are pending again.")
+                        last_requeue = time.monotonic()
+
+                    free = concurrency - len(running)
+                    for task in claim_tasks(free) if free else []:
+                        running.add(executor.submit(run_in_thread, task))
+
+                    if not running:
+                        if once:
+                            break
+                        time.sleep(settings.TASK_POLL_INTERVAL)
+                        continue
+                    finished, running = wait(running, timeout = settings.TASK_POLL_INTERVAL, return_when = FIRST_COMPLETED)
+                    for future in finished:
+                        if future.result():
+                            done += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running tasks ...")
+                wait(running)
+        self.stdout.write(self.style.SUCCESS(f"{done} tasks done, {failed} failed."))
@@ -0,0 +1,13 @@
+from django.core.files.storage import default_storage
+
+from .queue import task
+
+
+@task
+def delete_media_files(names):
+    """
+        Removes files (names in storage, not paths) from media,
+        missing ones are skipped.
+    """
+    for name in names:
+        default_storage.delete(name)
@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+# TASK TABLE
+class Task(models.Model):
+    """
+        Slow side effect (removing files, image variants, qr code ...) saved
+        by request and done later by the worker (manage.py run_tasks).
+        Done tasks are deleted, failed ones stay with their error.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, _("pending")),
+        (RUNNING, _("running")),
+        (FAILED, _("failed")),
+    )
+
+    name = models.CharField(
+        _("task"),
+        max_length=255,
+        help_text=_("format: dotted path of the task function")
+    )
+    args = models.JSONField(_("arguments"), default=list, blank=True)
+    kwargs = models.JSONField(_("keyword arguments"), default=dict, blank=True)
+    status = models.CharField(
+        _("status"),
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    max_attempts = models.PositiveIntegerField(_("maximum attempts"), default=5)
+    run_at = models.DateTimeField(
+        _("run at"),
+        default=timezone.now,
+        help_text=_("format: Y-m-d H:M:S, not run before this time (retries)")
+    )
+    locked_at = models.DateTimeField(_("taken by worker at"), null=True, blank=True)
+    last_error = models.TextField(_("last error"), blank=True)
+    created_at = models.DateTimeField(
+        auto_now_add= True,
+        verbose_name=_("date task created"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
+    updated_at = models.DateTimeField(
+        auto_now= True,
+        verbose_name=_("date task last updated"),
+        help_text=_("format: Y-m-d H:M:S")
+    )
+
+    class Meta:
+        verbose_name = _("task")
+        verbose_name_plural = _("tasks")
+        indexes = [
+            # WORKER: status = pending AND run_at <= now ORDER BY run_at
+            models.Index(fields=["status", "run_at"], name="task_status_run_at_idx"),
+        ]
+
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+# END TASK TABLE
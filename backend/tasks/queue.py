@@ -0,0 +1,137 @@
+import functools
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """
+        Makes function a task, function itself is not changed:
+            @task
+            def delete_media_files(names): ...
+
+            delete_media_files(names)          -> now
+            delete_media_files.enqueue(names)  -> by worker, after commit
+            delete_media_files.enqueue_once(names)  -> the same, if not waiting yet
+        Arguments must be json (str, int, list, dict ...).
+    """
+    func.task_name = f"{func.__module__}.{func.__qualname__}"
+    func.enqueue = functools.partial(enqueue, func)
+    func.enqueue_once = functools.partial(enqueue_once, func)
+    return func
+
+
+
+def enqueue(func, *args, **kwargs):
+    """
+        Row is written in the current transaction, so the worker sees it
+        only after commit and rollback drops it with the rest of changes.
+        TASKS_RUN_EAGER = True -> no worker, run after commit in this process.
+    """
+    if settings.TASKS_RUN_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    return Task.objects.create(
+        name = func.task_name,
+        args = list(args),
+        kwargs = kwargs,
+        max_attempts = settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+
+def enqueue_once(func, *args, **kwargs):
+    """
+        Like enqueue, but no new row if the same task (same arguments) is
+        already pending or running, e.g. every save before the worker has
+        run it. Not a lock, two requests at the same time may both add it,
+        the task must be safe to run twice.
+    """
+    if not settings.TASKS_RUN_EAGER:
+        waiting = Task.objects.filter(
+            name = func.task_name, args = list(args), kwargs = kwargs,
+            status__in = (Task.PENDING, Task.RUNNING),
+        ).first()
+        if waiting is not None:
+            return waiting
+    return enqueue(func, *args, **kwargs)
+
+
+
+def get_task_function(name):
+    func = import_string(name)
+    if getattr(func, "task_name", None) != name:
+        raise ImportError(f"{name} is not a task")
+    return func
+
+
+
+def claim_tasks(limit):
+    """
+        Takes up to limit due tasks for this worker. Every task is taken with
+        one UPDATE ... WHERE status = pending, so two workers never get the
+        same task (sqlite and postgres).
+    """
+    now = timezone.now()
+    due = (
+        Task.objects.filter(status = Task.PENDING, run_at__lte = now)
+        .order_by("run_at", "id")
+        .values_list("id", flat = True)[:limit * 2]
+    )
+    claimed = []
+    for task_id in due:
+        taken = Task.objects.filter(id = task_id, status = Task.PENDING).update(
+            status = Task.RUNNING, locked_at = now, attempts = F("attempts") + 1
+        )
+        if taken:
+            claimed.append(task_id)
+        if len(claimed) >= limit:
+            break
+    return list(Task.objects.filter(id__in = claimed).order_by("run_at", "id"))
+
+
+
+def run_task(task):
+    """
+        Done -> row is deleted. Error -> again after TASK_RETRY_DELAY * 2^(attempt-1)
+        seconds, after max_attempts -> failed (stays in admin with error).
+    """
+    try:
+        get_task_function(task.name)(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Task %s #%s failed (attempt %s)", task.name, task.id, task.attempts)
+        if task.attempts >= task.max_attempts:
+            Task.objects.filter(id = task.id).update(status = Task.FAILED, last_error = error, locked_at = None)
+        else:
+            delay = settings.TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+            Task.objects.filter(id = task.id).update(
+                status = Task.PENDING, last_error = error, locked_at = None,
+                run_at = timezone.now() + timedelta(seconds = delay),
+            )
+        return False
+    Task.objects.filter(id = task.id).delete()
+    return True
+
+
+
+def requeue_stale_tasks():
+    """
+        Tasks of a worker which was killed while running them are pending
+        again after TASK_LOCK_TIMEOUT.
+        return count of tasks
+    """
+    stale = timezone.now() - timedelta(seconds = settings.TASK_LOCK_TIMEOUT)
+    return Task.objects.filter(status = Task.RUNNING, locked_at__lt = stale).update(
+        status = Task.PENDING, locked_at = None
+    )
@@ -5,6 +5,22 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Deploy with async client views (ASYNC_CLIENT_VIEWS=True):
+
+    python manage.py collectstatic --noinput
+    ASYNC_CLIENT_VIEWS=True gunicorn config.asgi:application \
+        -k uvicorn.workers.UvicornWorker -w 2 -b 127.0.0.1:8000
+
+    nginx serves /static/ and /media/ (WhiteNoise is not used in this mode)
+    and proxies the rest to 127.0.0.1:8000 with NUM_PROXIES=1.
+
+One uvicorn worker keeps many connections waiting for cache/db, so peak
+hours need fewer workers (and less memory) than sync gunicorn workers.
+Admin and write endpoints stay sync DRF views, Django runs them in a thread.
+Compare both on your data:
+
+    python manage.py bench_client_servers --workers 2 --concurrency 200
 """
 
 import os
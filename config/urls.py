@@ -15,6 +15,8 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 import debug_toolbar
+from backend.api.v1.account.views import MyTokenObtainPairView
+from backend.product.views import resize_image
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -22,8 +24,7 @@ from django.urls import include, path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
-from rest_framework_simplejwt.views import (TokenObtainPairView,
-                                            TokenRefreshView, TokenVerifyView)
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -52,13 +53,16 @@ urlpatterns = [
     path("foooodify_admin/", admin.site.urls),
     
     # local apps
-    path('api/v1/auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/v1/auth/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/v1/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/v1/auth/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('api/v1/auth/user/', include('backend.api.v1.account.urls')),
     path('api/v1/food/', include('backend.api.v1.product.urls')),
     path('api/v1/restaurant/', include('backend.api.v1.restaurant.urls')),
     path('api/v1/foood/admindashboard/', include("backend.api.v1.admin_dashboard.urls")),
+
+    # resized images (signed), before static media
+    path('media/resize/<int:width>x<int:height>/<path:name>', resize_image, name='resize_image'),
     
 ]
 